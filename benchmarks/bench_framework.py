@@ -0,0 +1,245 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Запуск файлом из любого каталога: python /path/to/repo/benchmarks/bench_framework.py.
+# Для python -m benchmarks.bench_framework текущим каталогом должен быть корень репозитория
+# (или он должен быть в PYTHONPATH): иначе Python не найдёт сам пакет benchmarks
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import allure
+from requests import Response
+from requests.cookies import cookiejar_from_dict
+from requests.structures import CaseInsensitiveDict
+from environment import ENV_OBJECT, Environment
+from lib.assertions import Assertions
+from lib.base_case import BaseCase
+from lib.logger import Logger
+from lib.my_requests import MyRequests, SessionPool
+
+# Накладные расходы самого фреймворка на один вызов.
+# Бенчмарки *.no_network подменяют транспорт (MyRequests._perform_once) заглушкой,
+# которая сразу возвращает готовый ответ: в них нет ни сети, ни шума loopback, и
+# "overhead" - это время _send минус время самой заглушки. Остальные http-бенчмарки
+# ходят в локальный сервер (lib/local_server.py) на loopback.
+#
+# python -m benchmarks.bench_framework                      - прогнать и вывести
+# python -m benchmarks.bench_framework --save baseline      - сохранить в benchmarks/results/baseline.json
+# python -m benchmarks.bench_framework --compare baseline   - сравнить с сохранённым результатом
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def make_response(body: bytes = b'{"id": "2", "username": "Vitaliy", "email": "vinkotov@example.com", '
+                                b'"firstName": "Vitalii", "lastName": "Kotov"}'):
+    response = Response()
+    response.status_code = 200
+    response.headers = CaseInsensitiveDict({"Content-Type": "application/json", "x-csrf-token": "token"})
+    response.cookies = cookiejar_from_dict({"auth_sid": "sid"})
+    response.encoding = "utf-8"
+    response.elapsed = datetime.timedelta(milliseconds=1)
+    response._content = body
+    return response
+
+
+class StubTransport:
+    # Подменяет сетевую часть MyRequests на время бенчмарка
+    def __enter__(self):
+        self._perform_once = MyRequests.__dict__["_perform_once"]
+        MyRequests._perform_once = staticmethod(stub_perform_once)
+        return self
+
+    def __exit__(self, *exc_info):
+        MyRequests._perform_once = self._perform_once
+        return False
+
+
+def stub_perform_once(url: str, data: dict, headers: dict, cookies: dict, method: str):
+    return make_response()
+
+
+def measure(function, min_time: float, memory_samples: int = 50):
+    # Разогрев, затем столько вызовов, сколько уложится в min_time
+    for _ in range(10):
+        function()
+
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        for _ in range(100):
+            function()
+        calls += 100
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+
+    # Пиковая память, выделяемая за один вызов
+    tracemalloc.start()
+    peaks = []
+    for _ in range(memory_samples):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - current)
+    tracemalloc.stop()
+
+    return {
+        "calls_per_sec": round(calls / elapsed, 1),
+        "us_per_call": round(elapsed / calls * 1e6, 3),
+        "peak_alloc_bytes_per_call": int(sum(peaks) / len(peaks)),
+    }
+
+
+def build_benchmarks():
+    base_case = BaseCase()
+    response = make_response()
+
+    def raw_session_get():
+        SessionPool.get_session().get(f"{ENV_OBJECT.get_base_url()}/user/2")
+
+    def my_requests_send():
+        MyRequests._send("/user/2", None, None, None, "GET")
+
+    def my_requests_get():
+        MyRequests.get("/user/2")
+
+    def stub_transport():
+        stub_perform_once("http://127.0.0.1/user/2", None, {}, {}, "GET")
+
+    def allure_step():
+        with allure.step("GET request to URL '/user/2'"):
+            pass
+
+    def logger_format():
+        request = ("test", datetime.datetime.now(), "GET", "http://127.0.0.1/user/2", None, {}, {})
+        Logger._format_pair(request, response, 0.001)
+
+    def logger_write():
+        Logger.add_request("http://127.0.0.1/user/2", None, {}, {}, "GET")
+        Logger.add_response(response, 0.001)
+
+    def assertions_json_fresh():
+        Assertions.assert_json_has_key(make_response(), "username")
+
+    def assertions_json_cached():
+        Assertions.assert_json_has_key(response, "username")
+
+    def assertions_json_shape():
+        Assertions.assert_json_shape(response, present=["username", "email"], absent=["password"], values={"id": "2"})
+
+    def assertions_json_schema():
+        Assertions.assert_json_schema(response, "user_authorized")
+
+    def base_case_getters():
+        base_case.get_cookie(response, "auth_sid")
+        base_case.get_header(response, "x-csrf-token")
+        base_case.get_json_value(response, "username")
+
+    return {
+        "http.raw_session_get": raw_session_get,
+        "my_requests._send": my_requests_send,
+        "my_requests.get": my_requests_get,
+        "stub.transport": stub_transport,
+        "my_requests._send.no_network": my_requests_send,
+        "my_requests.get.no_network": my_requests_get,
+        "allure.step": allure_step,
+        "logger.format": logger_format,
+        "logger.add_request_response": logger_write,
+        "assertions.json_has_key.fresh": assertions_json_fresh,
+        "assertions.json_has_key.cached": assertions_json_cached,
+        "assertions.json_shape": assertions_json_shape,
+        "assertions.json_schema": assertions_json_schema,
+        "base_case.getters": base_case_getters,
+    }
+
+
+def run(names: list = None, min_time: float = 1.0):
+    ENV_OBJECT.env = Environment.LOCAL
+    Logger.log_dir = tempfile.mkdtemp(prefix="bench_logs_")
+    Logger.file_name = None
+
+    results = {}
+    for name, function in build_benchmarks().items():
+        if names and not any(part in name for part in names):
+            continue
+        if name.endswith(".no_network"):
+            with StubTransport():
+                results[name] = measure(function, min_time)
+        else:
+            results[name] = measure(function, min_time)
+        Logger.flush()
+
+    if "stub.transport" in results and "my_requests._send.no_network" in results:
+        # Сколько _send добавляет к транспорту; разность двух сетевых замеров тонула бы в шуме loopback
+        stub = results["stub.transport"]["us_per_call"]
+        send = results["my_requests._send.no_network"]
+        send["overhead_us_per_call"] = round(send["us_per_call"] - stub, 3)
+
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def results_path(name: str):
+    if name.endswith(".json") or os.sep in name:
+        return name
+    return os.path.join(RESULTS_DIR, f"{name}.json")
+
+
+def format_results(report: dict, baseline: dict = None):
+    lines = [f"{'benchmark':<34}{'calls/s':>12}{'us/call':>11}{'peak B/call':>13}{'vs baseline':>13}"]
+    for name, result in report["results"].items():
+        change = ""
+        if baseline is not None and name in baseline["results"]:
+            before = baseline["results"][name]["us_per_call"]
+            change = f"{(result['us_per_call'] - before) / before * 100:+.1f}%"
+        lines.append(
+            f"{name:<34}{result['calls_per_sec']:>12}{result['us_per_call']:>11}"
+            f"{result['peak_alloc_bytes_per_call']:>13}{change:>13}"
+        )
+    overhead = report["results"].get("my_requests._send.no_network", {}).get("overhead_us_per_call")
+    if overhead is not None:
+        lines.append(f"my_requests._send overhead without network: {overhead} us/call")
+    return "\n".join(lines)
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_framework", description="Framework overhead benchmarks")
+    parser.add_argument("names", nargs="*", help="run only benchmarks whose name contains one of these")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per benchmark")
+    parser.add_argument("--save", help="save results under this name (or path)")
+    parser.add_argument("--compare", help="compare against saved results (name or path)")
+    args = parser.parse_args(argv)
+
+    report = run(args.names, args.min_time)
+
+    baseline = None
+    if args.compare:
+        with open(results_path(args.compare), 'r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+
+    print(format_results(report, baseline))
+
+    if args.save:
+        file_name = results_path(args.save)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        with open(file_name, 'w', encoding='utf-8') as results_file:
+            json.dump(report, results_file, indent=2)
+        print(f"Saved to {file_name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,18 @@
 import os
-
-import export as export
+import threading
 
 # export ENV=prod
+# Несколько базовых URL окружения: export BASE_URLS=https://a.example/api,https://b.example/api
+# (выбор адреса, проверки и переключение - lib/base_urls.py)
 
 class Environment:
     DEV = 'dev'
     PROD = 'prod'
+    # Локальная in-process замена API (lib/local_server.py), тесты идут без сети.
+    # Если сервер уже запущен отдельно, его адрес можно задать в LOCAL_SERVER_URL
+    LOCAL = 'local'
 
+    # Значение - один URL или список равноправных адресов
     URLS = {
         DEV: 'https://playground.learnqa.ru/api_dev',
         PROD: 'https://playground.learnqa.ru/api',
@@ -18,14 +23,49 @@ class Environment:
             self.env = os.environ['ENV']
         except KeyError:
             self.env = self.DEV
+        self._pool = None
+        self._pool_env = None
+        self._pool_lock = threading.Lock()
 
     def get_base_url(self):
+        return self.get_pool().pick()
+
+    def failover_url(self, url: str):
+        # Базовый URL для повтора запроса, отправленного на url
+        return self.get_pool().failover(url)
+
+    def report(self, url: str, success: bool, latency: float = None, reachable: bool = True):
+        self.get_pool().report(url, success, latency, reachable)
+
+    def get_pool(self):
+        # Адреса окружения разбираются один раз; смена self.env (например, в бенчмарках) строит пул заново.
+        # Без блокировки одновременные первые запросы строили бы несколько пулов с фоновыми проверками
+        pool = self._pool
+        if pool is not None and self._pool_env == self.env:
+            return pool
+        with self._pool_lock:
+            if self._pool is None or self._pool_env != self.env:
+                from lib.base_urls import EndpointPool
+                env = self.env
+                pool = EndpointPool(self._resolve_urls(), env)
+                if self._pool is not None:
+                    self._pool.stop()
+                self._pool, self._pool_env = pool, env
+            return self._pool
+
+    def _resolve_urls(self):
+        if 'BASE_URLS' in os.environ:
+            return [url.strip() for url in os.environ['BASE_URLS'].split(',') if url.strip()]
+        if self.env == self.LOCAL:
+            if 'LOCAL_SERVER_URL' in os.environ:
+                return [os.environ['LOCAL_SERVER_URL']]
+            from lib.local_server import LocalServer
+            return [LocalServer.base_url()]
         if self.env in self.URLS:
-            return self.URLS[self.env]
+            urls = self.URLS[self.env]
+            return [urls] if isinstance(urls, str) else list(urls)
         else:
             raise Exception(f"Unknown value of ENV variable {self.env}")
 
 
 ENV_OBJECT = Environment()
-
-
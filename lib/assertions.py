@@ -1,45 +1,64 @@
-from requests import Response
-import json
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from lib.response_json import get_response_json
+from lib.schemas import validate
+
+if TYPE_CHECKING:
+    from requests import Response
 
 class Assertions:
     @staticmethod
     def assert_json_value_by_name(response: Response, name, expected_value, error_message):
-        try:
-            response_as_dict = response.json()
-        except json.JSONDecodeError:
-            assert False, f"Response is not in JSON format. Response text is '{response.text}'"
+        response_as_dict = get_response_json(response)
 
         assert name in response_as_dict, f"Response JSON doesn't have key {name}"
         assert response_as_dict[name] == expected_value, error_message
 
     @staticmethod
     def assert_json_has_key(response: Response, name):
-        try:
-            response_as_dict = response.json()
-        except json.JSONDecodeError:
-            assert False, f"Response is not in JSON format. Response text is '{response.text}'"
+        response_as_dict = get_response_json(response)
 
         assert name in response_as_dict, f"Response JSON doesn't have key {name}"
 
     @staticmethod
     def assert_json_has_keys(response: Response, names: list):
-        try:
-            response_as_dict = response.json()
-        except json.JSONDecodeError:
-            assert False, f"Response is not in JSON format. Response text is '{response.text}'"
+        response_as_dict = get_response_json(response)
 
         for name in names:
             assert name in response_as_dict, f"Response JSON doesn't have key {name}"
 
     @staticmethod
     def assert_json_has_not_key(response: Response, name):
-        try:
-            response_as_dict = response.json()
-        except json.JSONDecodeError:
-            assert False, f"Response is not in JSON format. Response text is '{response.text}'"
+        response_as_dict = get_response_json(response)
 
         assert name not in response_as_dict, f"Response JSON shouldn't have key {name}. Bot it has present"
 
+    @staticmethod
+    def assert_json_shape(response: Response, present: list = None, absent: list = None, values: dict = None):
+        # Проверяет сразу все условия и сообщает обо всех расхождениях одним сообщением
+        response_as_dict = get_response_json(response)
+        errors = []
+
+        for name in present or []:
+            if name not in response_as_dict:
+                errors.append(f"Response JSON doesn't have key {name}")
+        for name in absent or []:
+            if name in response_as_dict:
+                errors.append(f"Response JSON shouldn't have key {name}. Bot it has present")
+        for name, expected_value in (values or {}).items():
+            if name not in response_as_dict:
+                errors.append(f"Response JSON doesn't have key {name}")
+            elif response_as_dict[name] != expected_value:
+                errors.append(f"Unexpected value of key {name}. Expected: {expected_value!r}. Actual: {response_as_dict[name]!r}")
+
+        assert not errors, "; ".join(errors)
+
+    @staticmethod
+    def assert_json_schema(response: Response, schema):
+        # schema - имя схемы из lib/schemas.py ("user_authorized", "user_login", ...) или dict
+        errors = validate(get_response_json(response), schema)
+        assert not errors, f"Response JSON doesn't match schema {schema if isinstance(schema, str) else ''}: " + "; ".join(errors)
+
     @staticmethod
     def assert_code_status(response: Response, expected_status_code):
         assert response.status_code == expected_status_code, \
@@ -47,4 +66,9 @@ class Assertions:
 
     @staticmethod
     def assert_content(response: Response, expected_content):
-        assert response.content.decode("utf-8") == expected_content, f"Unexpected response content {response.content}"
\ No newline at end of file
+        body = getattr(response, "body", None)
+        if body is not None and not body.closed:
+            # Потоковый ответ сравнивается по кускам, не собирая тело в памяти
+            assert body.equals(expected_content.encode("utf-8")), f"Unexpected response content {body.describe()}"
+            return
+        assert response.content.decode("utf-8") == expected_content, f"Unexpected response content {response.content}"
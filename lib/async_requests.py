@@ -0,0 +1,97 @@
+import contextvars
+import functools
+import os
+import threading
+import weakref
+from lib.cassette import cassette_slot
+from lib.my_requests import MyRequests
+
+# asyncio-двойник MyRequests: те же post/get/put/delete, но корутины. Независимые запросы
+# теста (например, регистрация двух пользователей) идут одновременно:
+#   response1, response2 = AsyncMyRequests.run(
+#       AsyncMyRequests.post("/user", data=data1),
+#       AsyncMyRequests.post("/user", data=data2),
+#   )
+#
+# Сам запрос выполняет синхронный MyRequests в потоке: пул соединений, Logger, шаги allure,
+# кэш, повторы и кассеты те же, что у обычных запросов. Число одновременных запросов в event
+# loop ограничивает asyncio.Semaphore, пул потоков - того же размера:
+#   export MYREQUESTS_ASYNC_CONCURRENCY=10
+# asyncio загружается при первом запросе, а не при сборе тестов
+
+
+class AsyncMyRequests():
+    concurrency = int(os.environ.get('MYREQUESTS_ASYNC_CONCURRENCY', 10))
+
+    _semaphores = weakref.WeakKeyDictionary()
+    _executor = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    async def post(url: str, data: dict = None, headers: dict = None, cookies: dict = None):
+        return await AsyncMyRequests._run(MyRequests.post, url, data, headers, cookies)
+
+    @staticmethod
+    async def get(url: str, data: dict = None, headers: dict = None, cookies: dict = None, fresh: bool = False):
+        return await AsyncMyRequests._run(functools.partial(MyRequests.get, fresh=fresh), url, data, headers, cookies)
+
+    @staticmethod
+    async def put(url: str, data: dict = None, headers: dict = None, cookies: dict = None):
+        return await AsyncMyRequests._run(MyRequests.put, url, data, headers, cookies)
+
+    @staticmethod
+    async def delete(url: str, data: dict = None, headers: dict = None, cookies: dict = None):
+        return await AsyncMyRequests._run(MyRequests.delete, url, data, headers, cookies)
+
+    @staticmethod
+    def run(*coroutines):
+        # Для синхронных тестов: ответы в порядке аргументов, первое исключение пробрасывается.
+        # Номер корутины - номер в пачке для кассеты, как в MyRequests.batch
+        import asyncio
+
+        async def with_slot(index, coroutine):
+            cassette_slot.set(index)
+            return await coroutine
+
+        async def gather():
+            # Каждая задача gather получает свою копию контекста, номера не пересекаются
+            return await asyncio.gather(*[with_slot(index, coroutine) for index, coroutine in enumerate(coroutines)])
+
+        return asyncio.run(gather())
+
+    @classmethod
+    def configure(cls, concurrency: int):
+        with cls._lock:
+            cls.concurrency = concurrency
+            cls._semaphores = weakref.WeakKeyDictionary()
+            executor, cls._executor = cls._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    @classmethod
+    def _get_semaphore(cls):
+        # Свой семафор на каждый event loop: asyncio.run в каждом тесте создаёт новый
+        import asyncio
+        loop = asyncio.get_running_loop()
+        semaphore = cls._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = cls._semaphores.setdefault(loop, asyncio.Semaphore(cls.concurrency))
+        return semaphore
+
+    @classmethod
+    def _get_executor(cls):
+        if cls._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=cls.concurrency, thread_name_prefix="AsyncMyRequests")
+        return cls._executor
+
+    @classmethod
+    async def _run(cls, method, url: str, data: dict, headers: dict, cookies: dict):
+        import asyncio
+        async with cls._get_semaphore():
+            loop = asyncio.get_running_loop()
+            # Запрос выполняется в копии контекста корутины: номер в пачке и область кассеты
+            call = functools.partial(contextvars.copy_context().run, method, url, data, headers, cookies)
+            return await loop.run_in_executor(cls._get_executor(), call)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+import contextvars
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+from lib.my_requests import MyRequests
+from lib.response_json import get_response_json
+from environment import ENV_OBJECT
+
+if TYPE_CHECKING:
+    from requests import Response
+
+
+class AuthData:
+    def __init__(self, auth_sid: str, token: str, user_id, obtained_at: float = None):
+        self.auth_sid = auth_sid
+        self.token = token
+        self.user_id = user_id
+        self.obtained_at = time.monotonic() if obtained_at is None else obtained_at
+
+    @property
+    def headers(self):
+        return {"x-csrf-token": self.token}
+
+    @property
+    def cookies(self):
+        return {"auth_sid": self.auth_sid}
+
+
+# Тест с маркером fresh_login логинится заново при каждом вызове (см. фикстуру login_mode в tests/conftest.py)
+_fresh_login = contextvars.ContextVar("fresh_login", default=False)
+
+
+class AuthCache:
+    # Сколько секунд считаем сессию живой, после чего логинимся заново:
+    # export AUTH_CACHE_TTL=600
+    ttl = float(os.environ.get('AUTH_CACHE_TTL', 600))
+
+    # Кэш живёт в пределах процесса, то есть одной сессии pytest или одного воркера.
+    # Ключ включает окружение: сессия dev не годится для prod или local
+    _entries = {}
+    _key_locks = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, email: str, password: str, fresh: bool = False):
+        key = (ENV_OBJECT.env, email, password)
+        fresh = fresh or _fresh_login.get()
+        with cls._lock:
+            key_lock = cls._key_locks.setdefault(key, threading.Lock())
+
+        # Потоки, запросившие одни и те же учётные данные, ждут один логин
+        with key_lock:
+            entry = cls._entries.get(key)
+            if fresh or entry is None or cls._is_expired(entry):
+                entry = cls.login(email, password)
+                cls._entries[key] = entry
+            return entry
+
+    @classmethod
+    def invalidate(cls, email: str, password: str):
+        with cls._lock:
+            cls._entries.pop((ENV_OBJECT.env, email, password), None)
+
+    @classmethod
+    def clear(cls):
+        # Блокировки ключей не сбрасываются: поток может держать блокировку прямо сейчас,
+        # и новая блокировка того же ключа пустила бы второй логин параллельно первому
+        with cls._lock:
+            cls._entries.clear()
+
+    @staticmethod
+    def fresh_logins(enabled: bool = True):
+        # -> токен для reset_fresh_logins
+        return _fresh_login.set(enabled)
+
+    @staticmethod
+    def reset_fresh_logins(token):
+        _fresh_login.reset(token)
+
+    @staticmethod
+    def login(email: str, password: str):
+        response = MyRequests.post("/user/login", data={"email": email, "password": password})
+
+        assert "auth_sid" in response.cookies, "Cannot find cookie with name auth_sid in the last response"
+        assert "x-csrf-token" in response.headers, "Cannot find header with name x-csrf-token in the last response"
+        response_as_dict = get_response_json(response)
+        assert "user_id" in response_as_dict, "Response JSON doesn't have key user_id"
+
+        return AuthData(
+            response.cookies["auth_sid"],
+            response.headers["x-csrf-token"],
+            response_as_dict["user_id"]
+        )
+
+    @staticmethod
+    def is_auth_failure(response: Response):
+        if response.status_code == 401:
+            return True
+        return response.status_code == 400 and response.text == "Auth token not supplied"
+
+    @classmethod
+    def _is_expired(cls, entry: AuthData):
+        return time.monotonic() - entry.obtained_at > cls.ttl
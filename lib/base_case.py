@@ -1,6 +1,12 @@
-import json
-from requests import Response
-from datetime import datetime
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from lib.auth_cache import AuthCache
+from lib.data_generator import DataGenerator
+from lib.my_requests import MyRequests
+from lib.response_json import get_response_json
+
+if TYPE_CHECKING:
+    from requests import Response
 
 class BaseCase:
     def get_cookie(self, response: Response, cookie_name):
@@ -12,26 +18,29 @@ class BaseCase:
         return response.headers[headers_name]
 
     def get_json_value(self, response: Response, name):
-        try:
-            response_as_dict = response.json()
-        except json.decoder.JSONDecodeError:
-            assert False, f"Response is not in JSON format. Response text is '{response.text}'"
+        response_as_dict = get_response_json(response)
 
         assert name in response_as_dict, f"Response JSON doesn't have key {name}"
 
         return response_as_dict[name]
 
-    def prepare_registration_data(self, email=None):
-        if email is None:
-            base_part = "learnqa"
-            domain = "example.com"
-            random_part = datetime.now().strftime("%m%d%Y%H%M%S")
-            email = f"{base_part}{random_part}@{domain}"
-        return {
-            'password': '123',
-            'username': 'learnqa',
-            'firstName': 'learnqa',
-            'lastName': 'learnqa',
-            'email': email
-        }
+    def login(self, email, password, fresh=False):
+        # Логин кэшируется на сессию: повторный вызов с теми же данными не ходит в /user/login.
+        # fresh=True - принудительно залогиниться заново
+        return AuthCache.get(email, password, fresh=fresh)
+
+    def send_authorized(self, method, url, email, password, data=None):
+        # Запрос с закэшированной авторизацией; если сессия протухла, логинимся заново и повторяем
+        send = getattr(MyRequests, method.lower())
+        auth = self.login(email, password)
+        response = send(url, data=data, headers=auth.headers, cookies=auth.cookies)
 
+        if AuthCache.is_auth_failure(response):
+            auth = self.login(email, password, fresh=True)
+            response = send(url, data=data, headers=auth.headers, cookies=auth.cookies)
+
+        return response
+
+    def prepare_registration_data(self, email=None):
+        # Email уникален между воркерами, хостами и запусками (см. DataGenerator)
+        return DataGenerator.registration_data(email)
@@ -0,0 +1,187 @@
+import bisect
+import itertools
+import os
+import random
+import threading
+import time
+
+# Несколько базовых URL одного окружения (зеркала, региональные адреса, локальные замены):
+#   export BASE_URLS=https://a.example/api,https://b.example/api
+# или список в Environment.URLS. Один URL работает как раньше, без проверок и фонового потока.
+#
+# Выбор адреса для запроса (export BASE_URL_STRATEGY=latency|round_robin):
+#   latency     - случайно, с весом 1/задержка: быстрые адреса получают больше запросов
+#   round_robin - по кругу
+# Таблица выбора строится заново только при изменении здоровья или задержек,
+# сам выбор - одно обращение к готовому кортежу.
+#
+# Фоновый поток раз в probe_interval секунд запрашивает base_url + probe_path:
+# любой ответ, кроме 5xx, - адрес жив, время ответа уходит в задержку. Проверки
+# проходят через ограничитель частоты окружения (lib/rate_limiter.py), как и запросы тестов.
+# MyRequests сообщает об исходе каждой попытки (report): адрес, к которому не удалось
+# подключиться, или после failure_threshold ответов 5xx подряд выводится из ротации
+# на cooldown секунд или до успешной проверки. Запрос, не сумевший подключиться, сразу
+# один раз повторяется на другом адресе, даже если повторы выключены (см. lib/resilience.py);
+# повторы после 5xx уходят на другой адрес, только если они включены.
+# Если выведены все адреса, берётся тот, что вернётся в ротацию раньше всех.
+#   export BASE_URL_PROBE_INTERVAL=5 BASE_URL_PROBE_PATH=/user/2 BASE_URL_PROBE_TIMEOUT=2
+#   export BASE_URL_FAILURES=2 BASE_URL_COOLDOWN=10
+#
+# Адреса должны обслуживать общее хранилище: пользователь, созданный через одно зеркало,
+# ищется тестом, возможно, уже через другое.
+
+LATENCY = "latency"
+ROUND_ROBIN = "round_robin"
+
+_EWMA_ALPHA = 0.3
+_MIN_LATENCY = 0.001
+
+
+class Endpoint:
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.latency = None
+        self.failures = 0
+        self.down_until = 0.0
+
+    def is_up(self, now: float):
+        return self.down_until <= now
+
+    def weight(self, default_latency: float):
+        return 1.0 / max(self.latency if self.latency is not None else default_latency, _MIN_LATENCY)
+
+
+class EndpointPool:
+    strategy = os.environ.get('BASE_URL_STRATEGY', LATENCY)
+    probe_interval = float(os.environ.get('BASE_URL_PROBE_INTERVAL', 5))
+    probe_path = os.environ.get('BASE_URL_PROBE_PATH', '/user/2')
+    probe_timeout = float(os.environ.get('BASE_URL_PROBE_TIMEOUT', 2))
+    failure_threshold = int(os.environ.get('BASE_URL_FAILURES', 2))
+    cooldown = float(os.environ.get('BASE_URL_COOLDOWN', 10))
+
+    def __init__(self, urls: list, env: str = None):
+        if not urls:
+            raise ValueError("EndpointPool needs at least one base URL")
+        self.env = env
+        self.endpoints = [Endpoint(url) for url in urls]
+        self._by_url = {endpoint.url: endpoint for endpoint in self.endpoints}
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._prober = None
+        self._stop = threading.Event()
+        # (адреса, накопленные веса, время ближайшего возврата выведенного адреса)
+        self._table = None
+        self._rebuild()
+
+    def pick(self):
+        if len(self.endpoints) == 1:
+            return self.endpoints[0].url
+        self._ensure_prober()
+
+        urls, cumulative, expires_at = self._table
+        if expires_at <= time.monotonic():
+            with self._lock:
+                self._rebuild()
+            urls, cumulative, expires_at = self._table
+        if self.strategy == ROUND_ROBIN:
+            return urls[next(self._counter) % len(urls)]
+        return urls[bisect.bisect_right(cumulative, random.random() * cumulative[-1])]
+
+    def failover(self, url: str):
+        # Адрес для повтора: тот же, если он ещё в ротации, иначе новый выбор
+        endpoint = self._by_url.get(url)
+        if endpoint is None or endpoint.is_up(time.monotonic()):
+            return url
+        return self.pick()
+
+    def report(self, url: str, success: bool, latency: float = None, reachable: bool = True):
+        # reachable=False - обрыв соединения или таймаут, а не ответ сервера
+        endpoint = self._by_url.get(url)
+        if endpoint is None or len(self.endpoints) == 1:
+            return
+        with self._lock:
+            changed = self._update(endpoint, success, latency, reachable)
+            if changed:
+                self._rebuild()
+
+    def stop(self):
+        self._stop.set()
+        if self._prober is not None:
+            self._prober.join()
+            self._prober = None
+        self._stop.clear()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {"url": endpoint.url, "up": endpoint.is_up(now), "latency": endpoint.latency, "failures": endpoint.failures}
+                for endpoint in self.endpoints
+            ]
+
+    def _update(self, endpoint: Endpoint, success: bool, latency: float = None, reachable: bool = True):
+        # -> нужно ли перестроить таблицу выбора
+        if success:
+            was_down = not endpoint.is_up(time.monotonic())
+            endpoint.failures = 0
+            endpoint.down_until = 0.0
+            if latency is None:
+                return was_down
+            previous = endpoint.latency
+            endpoint.latency = latency if previous is None else previous + _EWMA_ALPHA * (latency - previous)
+            # Мелкие колебания задержки не стоят перестройки таблицы
+            return was_down or previous is None or abs(endpoint.latency - previous) > 0.1 * previous
+        endpoint.failures += 1
+        if (not reachable or endpoint.failures >= self.failure_threshold) and endpoint.is_up(time.monotonic()):
+            endpoint.down_until = time.monotonic() + self.cooldown
+            return True
+        return False
+
+    def _rebuild(self):
+        now = time.monotonic()
+        up = [endpoint for endpoint in self.endpoints if endpoint.is_up(now)]
+        down = [endpoint for endpoint in self.endpoints if not endpoint.is_up(now)]
+        if not up:
+            up = [min(down, key=lambda endpoint: endpoint.down_until)]
+        known = [endpoint.latency for endpoint in up if endpoint.latency is not None]
+        default_latency = sum(known) / len(known) if known else 1.0
+        cumulative = list(itertools.accumulate(endpoint.weight(default_latency) for endpoint in up))
+        expires_at = min((endpoint.down_until for endpoint in down), default=float("inf"))
+        self._table = (tuple(endpoint.url for endpoint in up), cumulative, expires_at)
+
+    def _ensure_prober(self):
+        if self._prober is not None or self.probe_interval <= 0:
+            return
+        with self._lock:
+            if self._prober is None:
+                self._prober = threading.Thread(target=self._probe_loop, name="EndpointPool.probe", daemon=True)
+                self._prober.start()
+
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval):
+            for endpoint in self.endpoints:
+                success, latency = self._probe(endpoint.url)
+                self.report(endpoint.url, success, latency, reachable=latency is not None)
+
+    def _probe(self, url: str):
+        # urllib, а не SessionPool: проверки не должны занимать соединения и куки тестов
+        import urllib.error
+        import urllib.request
+        from types import SimpleNamespace
+        from lib.rate_limiter import RateLimiter
+        if self.env is not None:
+            RateLimiter.acquire(self.env, "GET", self.probe_path)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url + self.probe_path, timeout=self.probe_timeout) as response:
+                response.read()
+                status, headers = response.status, response.headers
+        except urllib.error.HTTPError as error:
+            status, headers = error.code, error.headers
+        except (OSError, ValueError):
+            return False, None
+        latency = time.perf_counter() - started
+        if self.env is not None:
+            # 429 на проверку замедляет и запросы тестов
+            RateLimiter.observe(self.env, "GET", self.probe_path, SimpleNamespace(status_code=status, headers=headers))
+        return status < 500, latency
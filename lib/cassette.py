@@ -0,0 +1,262 @@
+from __future__ import annotations
+import base64
+import contextvars
+import datetime
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import TYPE_CHECKING
+from lib.endpoints import template_path
+from lib.worker import worker_id
+
+if TYPE_CHECKING:
+    from requests import Response
+
+# Запись и воспроизведение обменов MyRequests._send:
+#   export MYREQUESTS_MODE=record       - ходим в API и сохраняем каждый обмен
+#   export MYREQUESTS_MODE=replay       - отвечаем из сохранённого, без сети
+#   export MYREQUESTS_MODE=passthrough  - как обычно (по умолчанию)
+#   export MYREQUESTS_CASSETTE=cassettes/default
+#
+# Ключ обмена: тест + метод + путь с {id} вместо идентификаторов + хэш
+# нормализованного тела. Сгенерированные email, id, auth_sid и x-csrf-token
+# в ключ не попадают, поэтому записи совпадают между запусками. Одинаковые
+# ключи внутри теста воспроизводятся в порядке записи.
+#
+# При воспроизведении id берутся из записанных ответов, поэтому совпадают с
+# записанными путями, а сгенерированные email подменяются в телах ответов
+# на email текущего запуска.
+
+PASSTHROUGH = "passthrough"
+RECORD = "record"
+REPLAY = "replay"
+
+EXCHANGES_FILE = "exchanges.jsonl"
+# Параллельные процессы (lib/parallel.py) пишут каждый в свой файл: exchanges.w0.jsonl, ...
+EXCHANGES_PATTERN = "exchanges*.jsonl"
+
+_GENERATED_EMAIL_TEXT = r"learnqa[0-9A-Za-z_]*@example\.com"
+_GENERATED_EMAIL = re.compile(f"^{_GENERATED_EMAIL_TEXT}$")
+_GENERATED_EMAIL_IN_BODY = re.compile(_GENERATED_EMAIL_TEXT)
+_AUTH_NAMES = {"auth_sid", "x-csrf-token"}
+# Поля тела, значения которых меняются от запуска к запуску; остальные значения,
+# в том числе числовые (пароль "123", имя "1234"), входят в ключ как есть
+_DYNAMIC_FIELDS = {"id": "<id>", "user_id": "<id>", "auth_sid": "<auth>", "x-csrf-token": "<auth>"}
+
+
+def _normalize_value(value, name: str = None):
+    value = str(value)
+    if name is not None and name.lower() in _DYNAMIC_FIELDS:
+        return _DYNAMIC_FIELDS[name.lower()]
+    if _GENERATED_EMAIL.match(value):
+        return "<email>"
+    return value
+
+
+def _normalize_data(data):
+    if data is None:
+        return None
+    if isinstance(data, dict):
+        return {name: _normalize_value(value, str(name)) for name, value in sorted(data.items())}
+    return _normalize_value(data)
+
+
+# Запросы вне конкретного теста (например, фоновое пополнение UserPool) помечаются
+# своей областью, чтобы их ключи не зависели от того, какой тест идёт в этот момент
+cassette_scope = contextvars.ContextVar("cassette_scope", default=None)
+
+# Порядковый номер запроса внутри MyRequests.batch / AsyncMyRequests.run.
+# Одновременные запросы с одинаковым ключом завершаются в случайном порядке,
+# а номер в пачке одинаков при записи и воспроизведении
+cassette_slot = contextvars.ContextVar("cassette_slot", default=None)
+
+
+def _current_test():
+    scope = cassette_scope.get()
+    if scope is not None:
+        return scope
+    testname = os.environ.get('PYTEST_CURRENT_TEST') or ""
+    # "tests/test_x.py::TestX::test_y (call)" -> "tests/test_x.py::TestX::test_y"
+    return testname.rsplit(" ", 1)[0]
+
+
+def exchanges_file(directory: str):
+    worker = worker_id()
+    if worker == "main":
+        return os.path.join(directory, EXCHANGES_FILE)
+    return os.path.join(directory, f"exchanges.{worker}.jsonl")
+
+
+def clear_exchanges(directory: str):
+    for file_name in glob.glob(os.path.join(glob.escape(directory), EXCHANGES_PATTERN)):
+        os.remove(file_name)
+
+
+class Cassette:
+    def __init__(self, directory: str, mode: str):
+        self.directory = directory
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._file_name = exchanges_file(directory)
+        self._exact = {}
+        self._loose = {}
+        self._used = set()
+        self._emails = {}
+        if mode == REPLAY:
+            self._load()
+
+    @staticmethod
+    def make_keys(method: str, path: str, data, headers: dict, cookies: dict):
+        body = json.dumps(_normalize_data(data), sort_keys=True, ensure_ascii=False)
+        body_hash = hashlib.sha1(body.encode("utf-8")).hexdigest()[:16]
+        # Важно, какие авторизационные данные переданы, но не их значения
+        auth = ",".join(sorted(name.lower() for name in list(headers) + list(cookies) if name.lower() in _AUTH_NAMES))
+        loose = f"{method} {template_path(path)} {body_hash} {auth}"
+        return f"{_current_test()} {loose}", loose
+
+    def _load(self):
+        file_names = sorted(glob.glob(os.path.join(glob.escape(self.directory), EXCHANGES_PATTERN)))
+        if not file_names:
+            raise Exception(f"Cassette '{self._file_name}' not found. Record it first with MYREQUESTS_MODE=record")
+        for file_name in file_names:
+            with open(file_name, 'r', encoding='utf-8') as cassette_file:
+                for line in cassette_file:
+                    record = json.loads(line)
+                    self._exact.setdefault(record["key"], []).append(record)
+                    self._loose.setdefault(record["loose_key"], []).append(record)
+
+    def record(self, method: str, path: str, data, headers: dict, cookies: dict, response: Response):
+        key, loose_key = self.make_keys(method, path, data, headers, cookies)
+        content = response.content or b""
+        try:
+            body = {"text": content.decode("utf-8")}
+        except UnicodeDecodeError:
+            body = {"base64": base64.b64encode(content).decode("ascii")}
+
+        record = {
+            "key": key,
+            "loose_key": loose_key,
+            "path": path,
+            "slot": cassette_slot.get(),
+            "data": data if isinstance(data, dict) else None,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": dict(response.headers),
+            "cookies": dict(response.cookies),
+            "body": body,
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._file_name, 'a', encoding='utf-8') as cassette_file:
+                cassette_file.write(line)
+
+    def replay(self, method: str, url: str, path: str, data, headers: dict, cookies: dict):
+        key, loose_key = self.make_keys(method, path, data, headers, cookies)
+
+        with self._lock:
+            slot = cassette_slot.get()
+            record = self._next(self._exact.get(key), path, slot)
+            if record is None:
+                # Например, запросы фоновых потоков (пополнение UserPool) идут вне какого-то конкретного теста
+                record = self._next(self._loose.get(loose_key), path, slot)
+            if record is None:
+                raise Exception(f"No recorded exchange for {method} {path} in cassette '{self._file_name}'")
+            self._remember_emails(record, data)
+            emails = dict(self._emails)
+
+        return self._build_response(record, url, emails)
+
+    def _next(self, records: list, path: str, slot):
+        if not records:
+            return None
+        # Предпочтение неиспользованной записи с тем же путём (id в пути совпадают с записанными)
+        # и тем же номером в пачке, затем по порядку записи
+        best = None
+        best_score = -1
+        for record in records:
+            if id(record) in self._used:
+                continue
+            score = (record["path"] == path) * 2 + (record.get("slot") == slot)
+            if score > best_score:
+                best = record
+                best_score = score
+                if score == 3:
+                    break
+        if best is not None:
+            self._used.add(id(best))
+            return best
+        # Если запросов больше, чем записано, повторяем последний ответ
+        return records[-1]
+
+    def _remember_emails(self, record: dict, data):
+        recorded_data = record.get("data") or {}
+        if not isinstance(data, dict):
+            return
+        for name, value in data.items():
+            recorded_value = recorded_data.get(name)
+            if isinstance(recorded_value, str) and _GENERATED_EMAIL.match(recorded_value) and recorded_value != value:
+                self._emails[recorded_value] = str(value)
+
+    @staticmethod
+    def _build_response(record: dict, url: str, emails: dict):
+        from requests import Response
+        from requests.cookies import cookiejar_from_dict
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+
+        response = Response()
+        response.status_code = record["status"]
+        response.reason = record.get("reason")
+        response.headers = CaseInsensitiveDict(record["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.cookies = cookiejar_from_dict(record["cookies"])
+        response.url = url
+        response.elapsed = datetime.timedelta(0)
+        body = record["body"]
+        if "text" in body:
+            text = body["text"]
+            if emails:
+                text = _GENERATED_EMAIL_IN_BODY.sub(lambda match: emails.get(match.group(0), match.group(0)), text)
+            response._content = text.encode("utf-8")
+        else:
+            response._content = base64.b64decode(body["base64"])
+        return response
+
+
+class CassetteConfig:
+    mode = os.environ.get('MYREQUESTS_MODE', PASSTHROUGH)
+    directory = os.environ.get('MYREQUESTS_CASSETTE', os.path.join("cassettes", "default"))
+
+    _cassette = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, mode: str = None, directory: str = None):
+        if mode is not None:
+            cls.mode = mode
+        if directory is not None:
+            cls.directory = directory
+        with cls._lock:
+            cls._cassette = None
+
+    @classmethod
+    def active(cls):
+        if cls.mode == PASSTHROUGH:
+            return None
+        if cls.mode not in (RECORD, REPLAY):
+            raise Exception(f"Unknown value of MYREQUESTS_MODE variable {cls.mode}")
+        with cls._lock:
+            if cls._cassette is None:
+                if cls.mode == RECORD:
+                    # Перезапись: старая кассета заменяется новой
+                    # (при параллельной записи старые файлы заранее удаляет lib/parallel.py)
+                    file_name = exchanges_file(cls.directory)
+                    if os.path.exists(file_name):
+                        os.remove(file_name)
+                cls._cassette = Cassette(cls.directory, cls.mode)
+            return cls._cassette
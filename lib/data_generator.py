@@ -0,0 +1,85 @@
+import hashlib
+import itertools
+import os
+import threading
+import time
+from lib.worker import host_name, worker_id
+
+
+class DataGenerator:
+    base_part = "learnqa"
+    domain = "example.com"
+    password = "123"
+
+    required_fields = ["password", "username", "firstName", "lastName", "email"]
+    username_max_length = 250
+
+    _counter = itertools.count(1)
+    _lock = threading.Lock()
+    _prefix = None
+    _prefix_pid = None
+
+    @classmethod
+    def _email_prefix(cls):
+        # Уникальность между хостами, воркерами и запусками:
+        # хэш хоста + воркер + pid + время старта процесса + случайный суффикс.
+        # Внутри процесса письма различает монотонный счётчик
+        pid = os.getpid()
+        if cls._prefix is None or cls._prefix_pid != pid:
+            host_hash = hashlib.sha1(host_name().encode("utf-8")).hexdigest()[:4]
+            started = format(time.time_ns() // 1_000_000, "x")
+            random_part = os.urandom(2).hex()
+            cls._prefix = f"{cls.base_part}{host_hash}{worker_id()}p{pid}t{started}{random_part}"
+            cls._prefix_pid = pid
+            cls._counter = itertools.count(1)
+        return cls._prefix
+
+    @classmethod
+    def unique_email(cls):
+        with cls._lock:
+            prefix = cls._email_prefix()
+            number = next(cls._counter)
+        return f"{prefix}n{number}@{cls.domain}"
+
+    @classmethod
+    def registration_data(cls, email: str = None, **overrides):
+        data = {
+            'password': cls.password,
+            'username': 'learnqa',
+            'firstName': 'learnqa',
+            'lastName': 'learnqa',
+            'email': cls.unique_email() if email is None else email
+        }
+        data.update(overrides)
+        return data
+
+    @classmethod
+    def registration_batch(cls, count: int):
+        return [cls.registration_data() for _ in range(count)]
+
+    @classmethod
+    def without_field_cases(cls):
+        # [(field, payload, expected_error), ...]
+        cases = []
+        for field in cls.required_fields:
+            data = cls.registration_data()
+            del data[field]
+            cases.append((field, data, f"The following required params are missed: {field}"))
+        return cases
+
+    @classmethod
+    def username_length_cases(cls, lengths: list = None):
+        # [(length, payload, expected_error или None для валидной длины), ...]
+        # По умолчанию - граничные значения: 1 и 2, username_max_length и на единицу больше
+        if lengths is None:
+            lengths = [1, 2, cls.username_max_length, cls.username_max_length + 1]
+        cases = []
+        for length in lengths:
+            if length < 2:
+                expected_error = "The value of 'username' field is too short"
+            elif length > cls.username_max_length:
+                expected_error = "The value of 'username' field is too long"
+            else:
+                expected_error = None
+            cases.append((length, cls.registration_data(username="T" * length), expected_error))
+        return cases
@@ -0,0 +1,11 @@
+import re
+from urllib.parse import urlsplit
+
+_ID_SEGMENT = re.compile(r"^\d+$")
+
+
+def template_path(url: str):
+    # "/api_dev/user/12345?x=1" -> "/api_dev/user/{id}"
+    path = urlsplit(url).path or "/"
+    segments = ["{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/")]
+    return "/".join(segments)
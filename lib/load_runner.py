@@ -0,0 +1,305 @@
+import argparse
+import importlib
+import inspect
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from lib.endpoints import template_path
+from lib.metrics import Histogram
+from lib.my_requests import MyRequests
+
+# Нагрузочный прогон на основе существующих тестовых сценариев.
+#
+# Закрытая модель: N виртуальных пользователей выполняют сценарий по кругу.
+#   python -m lib.load_runner tests/test_user_edit.py::TestUserEdit::test_edit_just_created_user \
+#       --model closed --concurrency 20 --duration 60
+#
+# Открытая модель: сценарии запускаются с заданной частотой независимо от того,
+# успели ли завершиться предыдущие (не больше --concurrency одновременно).
+#   python -m lib.load_runner tests/test_user_delete.py::TestUserDelete::test_delete_just_created_user \
+#       --model open --rate 50 --concurrency 100 --duration 60
+#
+# Логирование запросов на время нагрузки лучше отключить: export LOG_ENABLED=0
+
+CLOSED = "closed"
+OPEN = "open"
+
+
+class EndpointStats:
+    def __init__(self):
+        # Гистограмма из lib/metrics.py: память не растёт с длиной прогона
+        self.latency = Histogram()
+        self.statuses = {}
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+
+    def add(self, duration: float, status: int = None, error: Exception = None, retries: int = 0, hedged: bool = False):
+        self.latency.add(duration)
+        self.retries += retries
+        self.hedges += int(hedged)
+        if error is not None or status is None or status >= 500:
+            self.errors += 1
+        if status is not None:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self, elapsed: float):
+        count = self.latency.count
+        return {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else None,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "statuses": {str(status): number for status, number in sorted(self.statuses.items())},
+            "latency_ms": {
+                name: round(self.latency.percentile(fraction) * 1000, 2) if count else None
+                for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+            },
+        }
+
+
+class LoadStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        self.scenarios = EndpointStats()
+        self.scenario_failures = {}
+
+    def on_request(self, method: str, path: str, response, duration: float, error: Exception = None):
+        key = f"{method} {template_path(path)}"
+        with self._lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats()
+            stats.add(
+                duration,
+                response.status_code if response is not None else None,
+                error,
+                getattr(response, "retries", 0),
+                getattr(response, "hedged", False)
+            )
+
+    def on_scenario(self, duration: float, error: Exception = None):
+        with self._lock:
+            self.scenarios.latency.add(duration)
+            if error is not None:
+                self.scenarios.errors += 1
+                name = f"{type(error).__name__}: {error}"[:200]
+                self.scenario_failures[name] = self.scenario_failures.get(name, 0) + 1
+
+    def report(self, elapsed: float, dropped: int = 0):
+        with self._lock:
+            return {
+                "elapsed_s": round(elapsed, 2),
+                "scenarios": self.scenarios.summary(elapsed),
+                "dropped_scenarios": dropped,
+                "scenario_failures": dict(self.scenario_failures),
+                "endpoints": {key: stats.summary(elapsed) for key, stats in sorted(self.endpoints.items())},
+            }
+
+
+def load_scenario(node_id: str):
+    # "tests/test_user_edit.py::TestUserEdit::test_edit_just_created_user" -> callable без аргументов
+    parts = node_id.split("::")
+    module_name = parts[0][:-3].replace("/", ".") if parts[0].endswith(".py") else parts[0]
+    target = importlib.import_module(module_name)
+
+    if len(parts) == 3:
+        test_class = getattr(target, parts[1])
+        method_name = parts[2]
+
+        def scenario():
+            instance = test_class()
+            if hasattr(instance, "setup_method"):
+                instance.setup_method()
+            method = getattr(instance, method_name)
+            with _scenario_arguments(method) as arguments:
+                method(**arguments)
+    elif len(parts) == 2:
+        function = getattr(target, parts[1])
+
+        def scenario():
+            with _scenario_arguments(function) as arguments:
+                function(**arguments)
+    else:
+        raise Exception(f"Bad scenario '{node_id}', expected path.py::Class::test or path.py::function")
+
+    scenario.__name__ = node_id
+    return scenario
+
+
+class _scenario_arguments:
+    # Подставляет в сценарий поддерживаемые фикстуры
+    def __init__(self, function):
+        self.function = function
+        self.user = None
+        self.state = None
+        self.state_mutates = False
+
+    def __enter__(self):
+        arguments = {}
+        for name in inspect.signature(self.function).parameters:
+            if name == "pooled_user":
+                from lib.user_pool import UserPool
+                self.user = UserPool.acquire()
+                arguments[name] = self.user
+            elif name == "state":
+                # Под нагрузкой каждый запуск сценария получает свою копию состояния
+                from lib.scheduler import acquire_state
+                state_name, self.state_mutates = _state_marker(self.function)
+                self.state = acquire_state(state_name)
+                arguments[name] = self.state
+            else:
+                raise Exception(f"Fixture '{name}' is not supported by the load runner")
+        return arguments
+
+    def __exit__(self, *exc_info):
+        if self.user is not None:
+            from lib.user_pool import UserPool
+            UserPool.release(self.user)
+        if self.state is not None:
+            from lib.scheduler import release_state
+            release_state(self.state, self.state_mutates)
+        return False
+
+
+def _state_marker(function):
+    # @pytest.mark.state(...) без pytest: маркеры лежат в атрибуте pytestmark функции
+    for mark in getattr(function, "pytestmark", []):
+        if mark.name == "state":
+            return mark.args[0] if mark.args else mark.kwargs["name"], bool(mark.kwargs.get("mutates", False))
+    raise Exception(f"Scenario '{function.__name__}' uses the 'state' fixture without @pytest.mark.state(...)")
+
+
+class LoadRunner:
+    def __init__(self, scenario, duration: float, concurrency: int = 10, model: str = CLOSED, rate: float = None):
+        if model not in (CLOSED, OPEN):
+            raise Exception(f"Unknown load model '{model}'")
+        if model == OPEN and not rate:
+            raise Exception("Open-loop model needs a target rate")
+        self.scenario = scenario
+        self.duration = duration
+        self.concurrency = concurrency
+        self.model = model
+        self.rate = rate
+        self.stats = LoadStats()
+        self._stop = threading.Event()
+
+    def _run_once(self):
+        started = time.perf_counter()
+        try:
+            self.scenario()
+        except Exception as error:
+            self.stats.on_scenario(time.perf_counter() - started, error)
+        else:
+            self.stats.on_scenario(time.perf_counter() - started)
+
+    def run(self):
+        MyRequests.add_listener(self.stats.on_request)
+        started = time.perf_counter()
+        dropped = 0
+        try:
+            if self.model == CLOSED:
+                self._run_closed(started + self.duration)
+            else:
+                dropped = self._run_open(started + self.duration)
+        finally:
+            MyRequests.remove_listener(self.stats.on_request)
+        return self.stats.report(time.perf_counter() - started, dropped)
+
+    def _run_closed(self, deadline: float):
+        def virtual_user():
+            while time.perf_counter() < deadline and not self._stop.is_set():
+                self._run_once()
+
+        threads = [threading.Thread(target=virtual_user, name=f"LoadRunner-{index}") for index in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            # Ctrl-C приходит в основной поток: виртуальные пользователи доделывают текущий сценарий и выходят
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _run_open(self, deadline: float):
+        interval = 1.0 / self.rate
+        in_flight = threading.Semaphore(self.concurrency)
+        dropped = 0
+
+        def run_and_release():
+            try:
+                self._run_once()
+            finally:
+                in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="LoadRunner") as executor:
+            next_start = time.perf_counter()
+            while next_start < deadline and not self._stop.is_set():
+                delay = next_start - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # Открытая модель не ждёт освобождения: если все слоты заняты, запуск считается пропущенным
+                if in_flight.acquire(blocking=False):
+                    executor.submit(run_and_release)
+                else:
+                    dropped += 1
+                next_start += interval
+        return dropped
+
+
+def format_report(report: dict):
+    lines = [
+        f"Elapsed: {report['elapsed_s']} s, scenarios: {report['scenarios']['requests']} "
+        f"({report['scenarios']['throughput_rps']}/s), failed: {report['scenarios']['errors']}, "
+        f"dropped: {report['dropped_scenarios']}",
+        f"{'endpoint':<28}{'count':>8}{'rps':>9}{'err%':>7}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}",
+    ]
+    for key, stats in report["endpoints"].items():
+        latency = stats["latency_ms"]
+        lines.append(
+            f"{key:<28}{stats['requests']:>8}{stats['throughput_rps']:>9}{stats['error_rate'] * 100:>7.2f}"
+            f"{latency['p50']:>9}{latency['p90']:>9}{latency['p95']:>9}{latency['p99']:>9}{latency['max']:>9}"
+        )
+    for name, count in report["scenario_failures"].items():
+        lines.append(f"FAILED x{count}: {name}")
+    return "\n".join(lines)
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(prog="python -m lib.load_runner", description="Drive test scenarios as load")
+    parser.add_argument("scenarios", nargs="+", help="path.py::Class::test, run in turns")
+    parser.add_argument("--model", choices=[CLOSED, OPEN], default=CLOSED)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rate", type=float, help="scenario starts per second (open model)")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    scenarios = [load_scenario(node_id) for node_id in args.scenarios]
+    counter = iter(range(sys.maxsize))
+    counter_lock = threading.Lock()
+
+    def mixed():
+        with counter_lock:
+            index = next(counter)
+        scenarios[index % len(scenarios)]()
+
+    runner = LoadRunner(mixed if len(scenarios) > 1 else scenarios[0], args.duration, args.concurrency, args.model, args.rate)
+    report = runner.run()
+
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+import argparse
+import hashlib
+import json
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Локальная замена playground.learnqa.ru для /user, /user/login, /user/auth и /user/{id}.
+# Отвечает теми же кодами и текстами ошибок, что и настоящий API, и позволяет
+# гонять тесты без сети: export ENV=local
+#
+# Можно запустить и отдельно: python -m lib.local_server --port 8080
+
+PROTECTED_USER_IDS = {1, 2, 3, 4, 5}
+REQUIRED_FIELDS = ["password", "username", "firstName", "lastName", "email"]
+
+
+class UserStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = {}
+        self._emails = {}
+        self._sessions = {}
+        self._next_id = 1
+        self._seed()
+
+    def _seed(self):
+        seed_users = [
+            ("lego@example.com", "Lego", "Lego", "Lego"),
+            ("vinkotov@example.com", "Vitaliy", "Vitalii", "Kotov"),
+            ("learnqa1@example.com", "learnqa1", "learnqa1", "learnqa1"),
+            ("learnqa2@example.com", "learnqa2", "learnqa2", "learnqa2"),
+            ("learnqa3@example.com", "learnqa3", "learnqa3", "learnqa3"),
+        ]
+        for email, username, first_name, last_name in seed_users:
+            self.create({
+                "email": email,
+                "password": "1234",
+                "username": username,
+                "firstName": first_name,
+                "lastName": last_name,
+            })
+
+    def create(self, data: dict):
+        with self._lock:
+            user_id = self._next_id
+            self._next_id += 1
+            user = {field: data[field] for field in REQUIRED_FIELDS}
+            user["id"] = user_id
+            self._users[user_id] = user
+            self._emails[data["email"]] = user_id
+            return user_id
+
+    def email_exists(self, email: str):
+        with self._lock:
+            return email in self._emails
+
+    def get(self, user_id: int):
+        with self._lock:
+            user = self._users.get(user_id)
+            return dict(user) if user is not None else None
+
+    def update(self, user_id: int, data: dict):
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return False
+            if "email" in data and data["email"] != user["email"]:
+                self._emails.pop(user["email"], None)
+                self._emails[data["email"]] = user_id
+            for field in REQUIRED_FIELDS:
+                if field in data:
+                    user[field] = data[field]
+            return True
+
+    def delete(self, user_id: int):
+        with self._lock:
+            user = self._users.pop(user_id, None)
+            if user is None:
+                return False
+            self._emails.pop(user["email"], None)
+            for auth_sid in [auth_sid for auth_sid, (session_user_id, _) in self._sessions.items() if session_user_id == user_id]:
+                del self._sessions[auth_sid]
+            return True
+
+    def login(self, email: str, password: str):
+        with self._lock:
+            user_id = self._emails.get(email)
+            if user_id is None or self._users[user_id]["password"] != password:
+                return None
+            auth_sid = secrets.token_hex(16)
+            token = secrets.token_hex(16)
+            self._sessions[auth_sid] = (user_id, token)
+            return user_id, auth_sid, token
+
+    def authorized_user_id(self, auth_sid: str, token: str):
+        if not auth_sid or not token:
+            return None
+        with self._lock:
+            session = self._sessions.get(auth_sid)
+        if session is None or session[1] != token:
+            return None
+        return session[0]
+
+
+class UserApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "LearnQALocal/1.0"
+    # Без этого заголовки и тело уходят разными пакетами и упираются в delayed ACK
+    disable_nagle_algorithm = True
+    store = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str):
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/")
+        params = self._parse_form(parts.query)
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            params.update(self._parse_form(self.rfile.read(length).decode("utf-8")))
+
+        if path == "/user" and method == "POST":
+            return self._register(params)
+        if path == "/user/login" and method == "POST":
+            return self._login(params)
+        if path == "/user/auth" and method == "GET":
+            return self._auth()
+
+        if path.startswith("/user/"):
+            user_id = path[len("/user/"):]
+            if user_id.isdigit():
+                user_id = int(user_id)
+                if method == "GET":
+                    return self._get_user(user_id)
+                if method == "PUT":
+                    return self._edit_user(user_id, params)
+                if method == "DELETE":
+                    return self._delete_user(user_id)
+
+        self._send_text(404, "Wrong HTTP method or URL")
+
+    @staticmethod
+    def _parse_form(body: str):
+        return {name: values[-1] for name, values in parse_qs(body, keep_blank_values=True).items()}
+
+    def _cookies(self):
+        cookies = {}
+        for chunk in (self.headers.get("Cookie") or "").split(";"):
+            if "=" in chunk:
+                name, value = chunk.strip().split("=", 1)
+                cookies[name] = value
+        return cookies
+
+    def _authorized_user_id(self):
+        return self.store.authorized_user_id(self._cookies().get("auth_sid"), self.headers.get("x-csrf-token"))
+
+    @staticmethod
+    def _validate(data: dict):
+        if "email" in data and "@" not in data["email"]:
+            return "Invalid email format"
+        if "username" in data:
+            if len(data["username"]) < 2:
+                return "The value of 'username' field is too short"
+            if len(data["username"]) > 250:
+                return "The value of 'username' field is too long"
+        return None
+
+    def _register(self, params: dict):
+        missed = [field for field in REQUIRED_FIELDS if field not in params]
+        if missed:
+            return self._send_text(400, f"The following required params are missed: {', '.join(missed)}")
+
+        error = self._validate(params)
+        if error is not None:
+            return self._send_text(400, error)
+        if self.store.email_exists(params["email"]):
+            return self._send_text(400, f"Users with email '{params['email']}' already exists")
+
+        user_id = self.store.create(params)
+        self._send_json(200, {"id": str(user_id)})
+
+    def _login(self, params: dict):
+        result = self.store.login(params.get("email"), params.get("password"))
+        if result is None:
+            return self._send_text(400, "Invalid username/password supplied")
+
+        user_id, auth_sid, token = result
+        self._send_json(200, {"user_id": user_id}, {
+            "Set-Cookie": f"auth_sid={auth_sid}; path=/",
+            "x-csrf-token": token,
+        })
+
+    def _auth(self):
+        user_id = self._authorized_user_id()
+        self._send_json(200, {"user_id": user_id or 0})
+
+    def _get_user(self, user_id: int):
+        user = self.store.get(user_id)
+        if user is None:
+            return self._send_text(404, "User not found")
+
+        if self._authorized_user_id() == user_id:
+            data = {
+                "id": str(user["id"]),
+                "username": user["username"],
+                "email": user["email"],
+                "firstName": user["firstName"],
+                "lastName": user["lastName"],
+            }
+        else:
+            data = {"username": user["username"]}
+
+        # ETag позволяет клиенту перепроверить закэшированный ответ (304 без тела)
+        body = json.dumps(data).encode("utf-8")
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", "application/json", {"ETag": etag})
+        self._send(200, body, "application/json", {"ETag": etag})
+
+    def _edit_user(self, user_id: int, params: dict):
+        authorized_user_id = self._authorized_user_id()
+        if authorized_user_id is None:
+            return self._send_text(400, "Auth token not supplied")
+
+        if "email" in params and "@" not in params["email"]:
+            return self._send_text(400, "Invalid email format")
+        for field in ("firstName", "lastName", "username"):
+            if field in params and len(params[field]) < 2:
+                return self._send_text(400, json.dumps({"error": f"Too short value for field {field}"}, separators=(",", ":")))
+
+        # Как и настоящий API, изменения применяются к пользователю из сессии,
+        # поэтому чужой пользователь не меняется
+        self.store.update(authorized_user_id, params)
+        self._send_text(200, "")
+
+    def _delete_user(self, user_id: int):
+        authorized_user_id = self._authorized_user_id()
+        if authorized_user_id is None:
+            return self._send_text(400, "Auth token not supplied")
+
+        if user_id in PROTECTED_USER_IDS or authorized_user_id in PROTECTED_USER_IDS:
+            return self._send_text(400, "Please, do not delete test users with ID 1, 2, 3, 4 or 5.")
+
+        self.store.delete(authorized_user_id)
+        self._send_text(200, "")
+
+    def _send_text(self, status: int, text: str, headers: dict = None):
+        self._send(status, text.encode("utf-8"), "text/html; charset=utf-8", headers)
+
+    def _send_json(self, status: int, data: dict, headers: dict = None):
+        self._send(status, json.dumps(data).encode("utf-8"), "application/json", headers)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class LocalHTTPServer(ThreadingHTTPServer):
+    # Очередь входящих соединений по умолчанию - 5: при всплеске новых соединений
+    # (нагрузочный прогон, много потоков) клиенты ждут повторной отправки SYN около секунды
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class LocalServer:
+    host = "127.0.0.1"
+
+    _server = None
+    _thread = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def start(cls, port: int = 0):
+        with cls._lock:
+            if cls._server is None:
+                handler = type("LocalUserApiHandler", (UserApiHandler,), {"store": UserStore()})
+                server = LocalHTTPServer((cls.host, port), handler)
+                cls._thread = threading.Thread(target=server.serve_forever, name="LocalServer", daemon=True)
+                cls._thread.start()
+                cls._server = server
+            return cls.base_url()
+
+    @classmethod
+    def base_url(cls):
+        if cls._server is None:
+            return cls.start()
+        host, port = cls._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @classmethod
+    def stop(cls):
+        with cls._lock:
+            if cls._server is not None:
+                cls._server.shutdown()
+                cls._server.server_close()
+                cls._server = None
+                cls._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m lib.local_server", description="Local stand-in for the LearnQA user API")
+    parser.add_argument("--host", default=LocalServer.host)
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    handler = type("LocalUserApiHandler", (UserApiHandler,), {"store": UserStore()})
+    server = LocalHTTPServer((args.host, args.port), handler)
+    print(f"Serving the user API on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
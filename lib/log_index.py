@@ -0,0 +1,200 @@
+import argparse
+import glob
+import hashlib
+import heapq
+import json
+import os
+import sys
+
+# Индекс для JSONL-логов (LOG_FORMAT=jsonl).
+# Для каждого файла лога рядом создаётся <файл>.idx: по строке на запись
+# со смещением в логе и полями, по которым ищем. Запросы читают только индекс,
+# а полные записи достают из лога через seek.
+#
+# В заголовке индекса - проиндексированный размер и признаки файла (inode и хэш первой
+# строки): после ротации (os.replace) под тем же именем оказывается новый файл, и его
+# индекс строится заново, а не дописывается к старому. Повторные попытки ("attempt")
+# и запросы без ответа в индекс не попадают: в выборках они только мешают.
+# Запрос читает индексы целиком (линейный проход по TSV, без сортировки по полям):
+# это дёшево, пока логи ротируются по размеру, но не рассчитано на гигабайты в одном файле.
+#
+# python -m lib.log_index build logs/
+# python -m lib.log_index query logs/ --status 4xx --path /user/{id} --test test_user_edit
+# python -m lib.log_index query logs/ --slowest 50
+
+INDEX_SUFFIX = ".idx"
+FIELDS = ("offset", "length", "status", "method", "path", "duration_ms", "test")
+
+
+def find_log_files(paths: list):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = glob.glob(os.path.join(path, "*.jsonl")) + glob.glob(os.path.join(path, "*.jsonl.[0-9]*"))
+        else:
+            candidates = [path]
+        for candidate in candidates:
+            if candidate.endswith(INDEX_SUFFIX) or candidate.endswith(".gz"):
+                continue
+            files.append(candidate)
+    return sorted(set(files))
+
+
+def _file_identity(log_name: str):
+    # inode сам по себе может достаться новому файлу, поэтому к нему добавляется хэш первой строки
+    with open(log_name, 'rb') as log_file:
+        first_line = log_file.readline()
+    inode = os.stat(log_name).st_ino
+    return f"{inode}:{hashlib.sha1(first_line).hexdigest()}"
+
+
+def _read_header(index_name: str):
+    # -> (проиндексированный размер, признаки файла); индекс без признаков строится заново
+    if not os.path.exists(index_name):
+        return 0, None
+    with open(index_name, 'r', encoding='utf-8') as index_file:
+        header = index_file.readline().rstrip("\n")
+    fields = dict(field.split("=", 1) for field in header.lstrip("#").split("\t") if "=" in field)
+    if "size" not in fields or "identity" not in fields:
+        return 0, None
+    return int(fields["size"]), fields["identity"]
+
+
+def build_index(log_name: str):
+    index_name = log_name + INDEX_SUFFIX
+    indexed_size, indexed_identity = _read_header(index_name)
+    log_size = os.path.getsize(log_name)
+    identity = _file_identity(log_name)
+
+    if indexed_size > log_size or indexed_identity != identity:
+        # Файл был перезаписан или заменён при ротации - строим индекс заново
+        indexed_size = 0
+    if indexed_size == log_size and os.path.exists(index_name):
+        return index_name
+
+    rows = []
+    with open(log_name, 'rb') as log_file:
+        log_file.seek(indexed_size)
+        offset = indexed_size
+        for line in log_file:
+            if not line.endswith(b"\n"):
+                # Недописанная запись - проиндексируем при следующем запуске
+                break
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                offset += len(line)
+                continue
+            if "attempt" in record or record.get("status") is None:
+                offset += len(line)
+                continue
+            rows.append("\t".join([
+                str(offset),
+                str(len(line)),
+                str(record.get("status") or ""),
+                record.get("method") or "",
+                record.get("path") or "",
+                str(record.get("duration_ms") or ""),
+                (record.get("test") or "").replace("\t", " "),
+            ]))
+            offset += len(line)
+
+    body = []
+    if indexed_size and os.path.exists(index_name):
+        with open(index_name, 'r', encoding='utf-8') as index_file:
+            index_file.readline()
+            body = index_file.read().splitlines()
+
+    with open(index_name, 'w', encoding='utf-8') as index_file:
+        index_file.write(f"#size={offset}\tidentity={identity}\n")
+        for row in body + rows:
+            index_file.write(row + "\n")
+
+    return index_name
+
+
+def read_index(log_name: str):
+    index_name = build_index(log_name)
+    with open(index_name, 'r', encoding='utf-8') as index_file:
+        index_file.readline()
+        for line in index_file:
+            values = line.rstrip("\n").split("\t")
+            entry = dict(zip(FIELDS, values))
+            entry["offset"] = int(entry["offset"])
+            entry["length"] = int(entry["length"])
+            entry["status"] = int(entry["status"]) if entry["status"] else None
+            entry["duration_ms"] = float(entry["duration_ms"]) if entry["duration_ms"] else None
+            entry["log"] = log_name
+            yield entry
+
+
+def status_matches(status: int, expected: str):
+    if status is None:
+        return False
+    if expected.endswith("xx"):
+        return str(status)[0] == expected[0]
+    return str(status) == expected
+
+
+def query(paths: list, status: str = None, method: str = None, path: str = None,
+          test: str = None, slowest: int = None):
+    def matches(entry: dict):
+        if status is not None and not status_matches(entry["status"], status):
+            return False
+        if method is not None and entry["method"] != method.upper():
+            return False
+        # Путь в логе включает базовый путь окружения (/api_dev/user/{id}),
+        # поэтому сравниваем по окончанию
+        if path is not None and not entry["path"].endswith(path):
+            return False
+        if test is not None and test not in entry["test"]:
+            return False
+        return True
+
+    entries = (entry for log_name in find_log_files(paths) for entry in read_index(log_name) if matches(entry))
+
+    if slowest is not None:
+        return heapq.nlargest(slowest, entries, key=lambda entry: entry["duration_ms"] or 0)
+    return list(entries)
+
+
+def load_record(entry: dict):
+    with open(entry["log"], 'rb') as log_file:
+        log_file.seek(entry["offset"])
+        return json.loads(log_file.read(entry["length"]))
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(prog="python -m lib.log_index", description="Index and query JSONL test logs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="build or update indexes")
+    build_parser.add_argument("paths", nargs="*", default=["logs"])
+
+    query_parser = subparsers.add_parser("query", help="query indexed logs")
+    query_parser.add_argument("paths", nargs="*", default=["logs"])
+    query_parser.add_argument("--status", help="exact code (404) or class (4xx)")
+    query_parser.add_argument("--method")
+    query_parser.add_argument("--path", help="templated path, e.g. /user/{id}")
+    query_parser.add_argument("--test", help="substring of the test name")
+    query_parser.add_argument("--slowest", type=int, help="return only the N slowest calls")
+    query_parser.add_argument("--full", action="store_true", help="print full JSON records")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        for log_name in find_log_files(args.paths):
+            print(build_index(log_name))
+        return 0
+
+    entries = query(args.paths, args.status, args.method, args.path, args.test, args.slowest)
+    for entry in entries:
+        if args.full:
+            print(json.dumps(load_record(entry), ensure_ascii=False))
+        else:
+            print(f"{entry['status']}\t{entry['method']}\t{entry['path']}\t{entry['duration_ms']} ms\t{entry['test']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,275 @@
+from __future__ import annotations
+import atexit
 import datetime
+import gzip
+import json
 import os
-from requests import Response
+import shutil
+import sys
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING
+from lib.endpoints import template_path
+from lib.response_body import describe_body
+from lib.worker import worker_tag
+
+if TYPE_CHECKING:
+    from requests import Response
+
+
+class LogFile:
+    def __init__(self, file_name: str, max_bytes: int, rotate_seconds: float, compress: bool, backup_count: int = 0):
+        self.file_name = file_name
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.compress = compress
+        self.backup_count = backup_count
+        self._file = None
+        self._opened_at = None
+        self._segment = 0
+
+    def write(self, data: str):
+        if self._file is not None and self._should_rotate():
+            self.rotate()
+        if self._file is None:
+            directory = os.path.dirname(self.file_name)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.file_name, 'a', encoding='utf-8')
+            self._opened_at = time.monotonic()
+        self._file.write(data)
+        self._file.flush()
+
+    def _should_rotate(self):
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            return True
+        if self.rotate_seconds and time.monotonic() - self._opened_at >= self.rotate_seconds:
+            return True
+        return False
+
+    def rotate(self):
+        self.close()
+        if not os.path.exists(self.file_name):
+            return
+
+        self._segment += 1
+        rotated_name = f"{self.file_name}.{self._segment}"
+        os.replace(self.file_name, rotated_name)
+
+        if self.compress:
+            with open(rotated_name, 'rb') as source, gzip.open(f"{rotated_name}.gz", 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated_name)
+
+        if self.backup_count and self._segment > self.backup_count:
+            # Хранятся только последние backup_count сегментов: самый старый удаляется вместе с индексом
+            expired_name = f"{self.file_name}.{self._segment - self.backup_count}"
+            for name in (expired_name, f"{expired_name}.gz", f"{expired_name}.idx"):
+                if os.path.exists(name):
+                    os.remove(name)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
 
 class Logger:
-    file_name = f"logs/log_" + str(datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")) + ".logs"
+    # У каждого процесса (воркера) свой файл лога, каталог создаётся автоматически:
+    # export LOG_DIR=logs
+    log_dir = os.environ.get('LOG_DIR', 'logs')
+    file_name = None
+
+    # Ротация по размеру (байты) и по времени (секунды), 0 - без ротации;
+    # старые сегменты можно сжимать gzip: export LOG_COMPRESS=1
+    # Хранятся последние LOG_BACKUP_COUNT сегментов (0 - все): export LOG_BACKUP_COUNT=10
+    max_bytes = int(os.environ.get('LOG_MAX_BYTES', 50 * 1024 * 1024))
+    rotate_seconds = float(os.environ.get('LOG_ROTATE_SECONDS', 0))
+    compress = os.environ.get('LOG_COMPRESS', '0') == '1'
+    backup_count = int(os.environ.get('LOG_BACKUP_COUNT', 10))
+
+    # Запись в файл ведёт фоновый поток, сбрасывая накопленное раз в flush_interval секунд:
+    # export LOG_FLUSH_INTERVAL=1
+    # Логирование можно полностью отключить: export LOG_ENABLED=0
+    flush_interval = float(os.environ.get('LOG_FLUSH_INTERVAL', 0.5))
+    enabled = os.environ.get('LOG_ENABLED', '1') != '0'
+
+    # Формат лога: text - как раньше, jsonl - одна JSON-запись на пару запрос/ответ
+    # (для поиска по ним есть python -m lib.log_index): export LOG_FORMAT=jsonl
+    log_format = os.environ.get('LOG_FORMAT', 'text')
+
+    # Длинные тела ответов пишутся в лог началом, длиной и sha256 (0 - всегда целиком):
+    # export LOG_MAX_BODY_CHARS=65536
+    max_body_chars = int(os.environ.get('LOG_MAX_BODY_CHARS', 64 * 1024))
+
+    _queue = queue.Queue()
+    _local = threading.local()
+    _writer = None
+    _writer_lock = threading.Lock()
+    _pid = os.getpid()
+    _file_name_pid = None
+
+    @classmethod
+    def get_file_name(cls):
+        if cls.file_name is None or cls._file_name_pid != os.getpid():
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            extension = "jsonl" if cls.log_format == "jsonl" else "logs"
+            cls.file_name = os.path.join(cls.log_dir, f"log_{timestamp}_{worker_tag()}.{extension}")
+            cls._file_name_pid = os.getpid()
+        return cls.file_name
 
     @classmethod
     def _write_log_to_file(cls, data: str):
-        with open(cls.file_name, 'a', encoding='utf-8') as logger_file:
-            logger_file.write(data)
+        cls._enqueue(("text", data))
 
     @classmethod
     def add_request(cls, url: str, data: dict, headers: dict, cookies: dict, method: str):
+        if not cls.enabled:
+            return
+
+        # Запрос без ответа (например, упавший с исключением) всё равно попадает в лог
+        cls._flush_pending_request()
+
+        # Строка лога формируется позже в фоновом потоке, поэтому словари копируются:
+        # тест может изменить их сразу после запроса
+        if isinstance(data, dict):
+            data = dict(data)
         testname = os.environ.get('PYTEST_CURRENT_TEST')
+        cls._local.pending = (testname, datetime.datetime.now(), method, url, data, dict(headers), dict(cookies))
+
+    @classmethod
+    def add_response(cls, response: Response, duration: float = None):
+        if not cls.enabled:
+            return
+
+        request = getattr(cls._local, 'pending', None)
+        cls._local.pending = None
+        if duration is None:
+            duration = response.elapsed.total_seconds()
+        # Запрос и ответ кладутся в очередь одной записью, поэтому записи
+        # из разных потоков не перемешиваются
+        cls._enqueue(("pair", request, response, duration))
+
+    @classmethod
+    def add_attempt(cls, response: Response, duration: float, note: str):
+        # Неудачная попытка перед повтором: пишется с тем же запросом, а запрос
+        # продолжает ждать окончательного ответа
+        if not cls.enabled:
+            return
+        request = getattr(cls._local, 'pending', None)
+        cls._enqueue(("pair", request, response, duration, note))
+
+    @classmethod
+    def flush(cls):
+        if cls._writer is None or not cls._writer.is_alive():
+            return
+        done = threading.Event()
+        cls._queue.put(("flush", done))
+        cls._wait(done)
+
+    @classmethod
+    def _wait(cls, done: threading.Event):
+        # Поток записи мог упасть после проверки is_alive(): тогда ждать больше некого
+        writer = cls._writer
+        while not done.wait(0.1):
+            if writer is None or not writer.is_alive():
+                return False
+        return True
+
+    @classmethod
+    def _flush_pending_request(cls):
+        request = getattr(cls._local, 'pending', None)
+        if request is not None:
+            cls._local.pending = None
+            cls._enqueue(("pair", request, None, None))
+
+    @classmethod
+    def _enqueue(cls, record: tuple):
+        cls._ensure_writer()
+        cls._queue.put(record)
+
+    @classmethod
+    def _ensure_writer(cls):
+        if cls._pid != os.getpid():
+            # После fork поток записи и очередь родителя недоступны: начинаем свой файл
+            cls._queue = queue.Queue()
+            cls._writer_lock = threading.Lock()
+            cls._local = threading.local()
+            cls._writer = None
+            cls._pid = os.getpid()
+        if cls._writer is not None and cls._writer.is_alive():
+            return
+        with cls._writer_lock:
+            if cls._writer is not None and cls._writer.is_alive():
+                return
+            cls._writer = threading.Thread(target=cls._writer_loop, name="Logger-writer", daemon=True)
+            cls._writer.start()
+
+    @classmethod
+    def _writer_loop(cls):
+        logger_file = LogFile(cls.get_file_name(), cls.max_bytes, cls.rotate_seconds, cls.compress, cls.backup_count)
+        buffer = []
+        last_flush = time.monotonic()
+
+        try:
+            while True:
+                timeout = max(cls.flush_interval - (time.monotonic() - last_flush), 0)
+                try:
+                    record = cls._queue.get(timeout=timeout)
+                except queue.Empty:
+                    record = None
+
+                waiters = []
+                stop = False
+                while record is not None:
+                    kind = record[0]
+                    if kind == "flush":
+                        waiters.append(record[1])
+                    elif kind == "stop":
+                        waiters.append(record[1])
+                        stop = True
+                    elif kind == "text":
+                        buffer.append(record[1])
+                    else:
+                        buffer.append(cls._format_record(record))
+                    try:
+                        record = cls._queue.get_nowait()
+                    except queue.Empty:
+                        record = None
+
+                if buffer and (waiters or time.monotonic() - last_flush >= cls.flush_interval):
+                    logger_file.write("".join(buffer))
+                    buffer = []
+                if not buffer:
+                    last_flush = time.monotonic()
+
+                for waiter in waiters:
+                    waiter.set()
+                if stop:
+                    break
+        finally:
+            logger_file.close()
+
+    @classmethod
+    def _format_record(cls, record: tuple):
+        # Ошибка форматирования одной записи не должна останавливать поток записи
+        try:
+            return cls._format_pair(*record[1:])
+        except Exception as error:
+            message = f"Logger: cannot format record: {type(error).__name__}: {error}"
+            sys.stderr.write(message + "\n")
+            if cls.log_format == "jsonl":
+                return json.dumps({"logger_error": message}, ensure_ascii=False) + "\n"
+            return f"\n-----\n{message}\n"
+
+    @staticmethod
+    def _format_request(request: tuple):
+        testname, request_time, method, url, data, headers, cookies = request
 
         data_to_add = f"\n-----\n"
         data_to_add += f"Test: {testname}\n"
-        data_to_add += f"Time: {str(datetime.datetime.now())}\n"
+        data_to_add += f"Time: {str(request_time)}\n"
         data_to_add += f"Request method: {method}\n"
         data_to_add += f"Request URL: {url}\n"
         data_to_add += f"Request data: {data}\n"
@@ -24,17 +277,89 @@ class Logger:
         data_to_add += f"Request cookies: {cookies}\n"
         data_to_add += "\n"
 
-        cls._write_log_to_file(data_to_add)
+        return data_to_add
 
     @classmethod
-    def add_response(cls, response: Response):
+    def _format_response(cls, response: Response):
         cookies_as_dict = dict(response.cookies)
         headers_as_dict = dict(response.headers)
 
         data_to_add = f"Response code: {response.status_code}\n"
-        data_to_add += f"Response text: {response.text}\n"
+        if getattr(response, "from_cache", False):
+            data_to_add += f"Response source: cache\n"
+        if getattr(response, "retries", 0):
+            data_to_add += f"Response after retries: {response.retries}\n"
+        if getattr(response, "hedged", False):
+            data_to_add += f"Response hedged: {'duplicate request won' if getattr(response, 'hedge_won', False) else 'first request won'}\n"
+        data_to_add += f"Response text: {describe_body(response, cls.max_body_chars)}\n"
         data_to_add += f"Response header: {headers_as_dict}\n"
         data_to_add += f"Response cookies: {cookies_as_dict}\n"
         data_to_add += f"\n-----\n"
 
-        cls._write_log_to_file(data_to_add)
\ No newline at end of file
+        return data_to_add
+
+    @classmethod
+    def _format_json(cls, request: tuple, response: Response, duration: float, note: str = None):
+        record = {}
+        if request is not None:
+            testname, request_time, method, url, data, headers, cookies = request
+            record.update({
+                "test": testname,
+                "time": request_time.isoformat(),
+                "method": method,
+                "url": url,
+                "path": template_path(url),
+                "request": {"data": data, "headers": headers, "cookies": cookies},
+            })
+        if response is not None:
+            record.update({
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 3) if duration is not None else None,
+                "response": {
+                    "text": describe_body(response, cls.max_body_chars),
+                    "headers": dict(response.headers),
+                    "cookies": dict(response.cookies),
+                },
+            })
+            if getattr(response, "from_cache", False):
+                record["from_cache"] = True
+            body = getattr(response, "body", None)
+            if body is not None:
+                record["response"]["length"] = body.length
+                record["response"]["sha256"] = body.sha256
+            if getattr(response, "retries", 0):
+                record["retries"] = response.retries
+            if getattr(response, "hedged", False):
+                record["hedged"] = "duplicate" if getattr(response, "hedge_won", False) else "primary"
+        else:
+            record["status"] = None
+        if note is not None:
+            record["attempt"] = note
+        return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+    @classmethod
+    def _format_pair(cls, request: tuple, response: Response, duration: float = None, note: str = None):
+        if cls.log_format == "jsonl":
+            return cls._format_json(request, response, duration, note)
+
+        data_to_add = ""
+        if request is not None:
+            data_to_add += cls._format_request(request)
+        if note is not None:
+            data_to_add += f"Attempt: {note}\n"
+        if response is not None:
+            data_to_add += cls._format_response(response)
+        return data_to_add
+
+    @classmethod
+    def _shutdown(cls):
+        if cls._pid != os.getpid() or cls._writer is None or not cls._writer.is_alive():
+            return
+        cls._flush_pending_request()
+        done = threading.Event()
+        cls._queue.put(("stop", done))
+        if cls._wait(done):
+            cls._writer.join()
+
+
+atexit.register(Logger._shutdown)
@@ -0,0 +1,148 @@
+import bisect
+import json
+import math
+import os
+import threading
+from lib.endpoints import template_path
+from lib.timing import PHASES
+
+
+# Логарифмические корзины от 10 мкс до 10 минут с шагом 5%: память постоянная,
+# а относительная погрешность перцентилей не больше шага корзины
+_MIN_BOUND = 1e-5
+_MAX_BOUND = 600.0
+_GROWTH = 1.05
+_BOUNDS = [_MIN_BOUND * _GROWTH ** index for index in range(int(math.log(_MAX_BOUND / _MIN_BOUND, _GROWTH)) + 2)]
+
+
+class Histogram:
+    bounds = _BOUNDS
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, fraction: float):
+        if not self.count:
+            return None
+        rank = max(math.ceil(fraction * self.count), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                value = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.sum / self.count) if self.count else None,
+            "min_ms": ms(self.min),
+            "p50_ms": ms(self.percentile(0.5)),
+            "p90_ms": ms(self.percentile(0.9)),
+            "p99_ms": ms(self.percentile(0.99)),
+            "max_ms": ms(self.max),
+        }
+
+
+class RequestMetrics:
+    # Гистограммы фаз запроса по методу и шаблону пути: ("GET", "/user/{id}") -> {фаза: Histogram}
+    enabled = os.environ.get('METRICS_ENABLED', '1') != '0'
+
+    # Счётчики по тем же ключам: повторы, дублирующие запросы (и сколько раз дубль ответил первым), ошибки
+    COUNTERS = ("retries", "hedges", "hedge_wins", "errors")
+
+    _lock = threading.Lock()
+    _histograms = {}
+    _counters = {}
+
+    @classmethod
+    def on_request(cls, method: str, path: str, response, duration: float, error: Exception = None):
+        # Подписчик MyRequests (см. MyRequests.add_listener)
+        if not cls.enabled or getattr(response, "from_cache", False):
+            return
+        timings = getattr(response, "timings", None) or {"total": duration}
+        key = (method, template_path(path))
+        with cls._lock:
+            phases = cls._histograms.get(key)
+            if phases is None:
+                phases = cls._histograms[key] = {phase: Histogram() for phase in PHASES}
+                cls._counters[key] = dict.fromkeys(cls.COUNTERS, 0)
+            for phase, value in timings.items():
+                if phase in phases:
+                    phases[phase].add(value)
+
+            counters = cls._counters[key]
+            counters["retries"] += getattr(response, "retries", 0)
+            counters["hedges"] += int(getattr(response, "hedged", False))
+            counters["hedge_wins"] += int(getattr(response, "hedge_won", False))
+            counters["errors"] += int(error is not None)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._histograms = {}
+            cls._counters = {}
+
+    @classmethod
+    def to_dict(cls):
+        with cls._lock:
+            data = {}
+            for (method, path), phases in sorted(cls._histograms.items()):
+                endpoint = {phase: histogram.summary() for phase, histogram in phases.items() if histogram.count}
+                endpoint["requests"] = dict(cls._counters[(method, path)])
+                data[f"{method} {path}"] = endpoint
+            return data
+
+    @classmethod
+    def summary_table(cls):
+        data = cls.to_dict()
+        if not data:
+            return ""
+        lines = [
+            f"{'endpoint':<28}{'count':>7}" + "".join(f"{phase + ' p50/p99':>20}" for phase in PHASES)
+            + f"{'retries/hedges/errors':>24}"
+        ]
+        for endpoint, phases in data.items():
+            line = f"{endpoint:<28}{phases['total']['count']:>7}"
+            for phase in PHASES:
+                stats = phases.get(phase)
+                line += f"{stats['p50_ms']:>10}/{stats['p99_ms']:<9}" if stats else f"{'-':>20}"
+            counters = phases["requests"]
+            line += f"{counters['retries']:>12}/{counters['hedges']}/{counters['errors']}"
+            lines.append(line)
+        lines.append("(milliseconds)")
+        return "\n".join(lines)
+
+    @classmethod
+    def write_json(cls, file_name: str):
+        directory = os.path.dirname(file_name)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(file_name, 'w', encoding='utf-8') as metrics_file:
+            json.dump(cls.to_dict(), metrics_file, indent=2)
+        return file_name
@@ -1,32 +1,245 @@
-import requests
+import contextvars
+import os
+import threading
+import time
+from lib.cassette import CassetteConfig, REPLAY, cassette_slot
+from lib import timing
 from lib.logger import Logger
-import allure
+from lib.rate_limiter import RateLimiter
+from lib.reporting import step
+from lib.resilience import Resilience
+from lib.response_body import read_streamed
+from lib.response_cache import ResponseCache
 from environment import ENV_OBJECT
 
+# requests, urllib3 и allure импортируются при первом запросе, а не при импорте модуля:
+# сбор тестов и запуск воркеров не платят за них заранее (см. tests/test_import_time.py).
+# Шаги allure зависят от режима отчёта (см. lib/reporting.py)
+
+
+class SessionPool:
+    # Настройки пула можно переопределить переменными окружения:
+    # export MYREQUESTS_POOL_SIZE=20 MYREQUESTS_IDLE_TIMEOUT=30
+    pool_size = int(os.environ.get('MYREQUESTS_POOL_SIZE', 10))
+    idle_timeout = float(os.environ.get('MYREQUESTS_IDLE_TIMEOUT', 60))
+
+    _local = threading.local()
+    _lock = threading.Lock()
+    _sessions = []
+    _closed_stats = {"opened": 0, "requests": 0}
+
+    @classmethod
+    def configure(cls, pool_size: int = None, idle_timeout: float = None):
+        if pool_size is not None:
+            cls.pool_size = pool_size
+        if idle_timeout is not None:
+            cls.idle_timeout = idle_timeout
+        cls.close()
+
+    @classmethod
+    def get_session(cls):
+        session = getattr(cls._local, 'session', None)
+        now = time.monotonic()
+
+        if session is not None and now - cls._local.last_used > cls.idle_timeout:
+            cls._close_session(session)
+            session = None
+
+        if session is None:
+            session = cls._new_session()
+            cls._local.session = session
+
+        cls._local.last_used = now
+        return session
+
+    @classmethod
+    def _new_session(cls):
+        from http.cookiejar import DefaultCookiePolicy
+        import requests
+        from lib.timed_adapter import TimedHTTPAdapter
+
+        session = requests.Session()
+        # Сессия не должна запоминать cookies между запросами: каждый вызов
+        # MyRequests передаёт свои cookies явно, как и раньше
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = TimedHTTPAdapter(pool_connections=cls.pool_size, pool_maxsize=cls.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        with cls._lock:
+            cls._sessions.append(session)
+        return session
+
+    @classmethod
+    def _close_session(cls, session):
+        opened, sent = cls._session_stats(session)
+        with cls._lock:
+            cls._closed_stats["opened"] += opened
+            cls._closed_stats["requests"] += sent
+            if session in cls._sessions:
+                cls._sessions.remove(session)
+        session.close()
+
+    @classmethod
+    def close(cls):
+        with cls._lock:
+            sessions = list(cls._sessions)
+        for session in sessions:
+            cls._close_session(session)
+        cls._local = threading.local()
+
+    @staticmethod
+    def _session_stats(session):
+        opened = 0
+        sent = 0
+        for adapter in set(session.adapters.values()):
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                opened += pool.num_connections
+                sent += pool.num_requests
+        return opened, sent
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            opened = cls._closed_stats["opened"]
+            sent = cls._closed_stats["requests"]
+            sessions = list(cls._sessions)
+        for session in sessions:
+            session_opened, session_sent = cls._session_stats(session)
+            opened += session_opened
+            sent += session_sent
+        return {
+            "sessions": len(sessions),
+            "requests": sent,
+            "connections_opened": opened,
+            "connections_reused": max(sent - opened, 0),
+        }
+
+
+class BatchResult:
+    def __init__(self, spec: dict, response=None, error: Exception = None):
+        self.spec = spec
+        self.response = response
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def unwrap(self):
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
 class MyRequests():
+    # Размер пула потоков для MyRequests.batch:
+    # export MYREQUESTS_BATCH_WORKERS=20
+    batch_workers = int(os.environ.get('MYREQUESTS_BATCH_WORKERS', 10))
+
+    # Потоковое чтение тел ответов с ограничением размера (см. lib/response_body.py):
+    # export MYREQUESTS_STREAM=1 MYREQUESTS_MAX_BODY_BYTES=10485760
+    stream = os.environ.get('MYREQUESTS_STREAM', '0') == '1'
+    max_body_bytes = int(os.environ.get('MYREQUESTS_MAX_BODY_BYTES', 10 * 1024 * 1024))
+
+    # Подписчики на каждый выполненный запрос: callback(method, path, response, duration, error)
+    _listeners = []
+
     @staticmethod
     def post(url: str, data: dict = None, headers: dict = None, cookies: dict = None):
-        with allure.step(f"POST request to URL '{url}'"):
+        with step(f"POST request to URL '{url}'"):
             return MyRequests._send(url, data, headers, cookies, "POST")
 
     @staticmethod
-    def get(url: str, data: dict = None, headers: dict = None, cookies: dict = None):
-        with allure.step(f"GET request to URL '{url}'"):
-            return MyRequests._send(url, data, headers, cookies, "GET")
+    def get(url: str, data: dict = None, headers: dict = None, cookies: dict = None, fresh: bool = False):
+        # fresh=True - мимо кэша ответов (см. lib/response_cache.py)
+        with step(f"GET request to URL '{url}'"):
+            return MyRequests._send(url, data, headers, cookies, "GET", fresh)
 
     @staticmethod
     def put(url: str, data: dict = None, headers: dict = None, cookies: dict = None):
-        with allure.step(f"PUT request to URL '{url}'"):
+        with step(f"PUT request to URL '{url}'"):
             return MyRequests._send(url, data, headers, cookies, "PUT")
 
     @staticmethod
     def delete(url: str, data: dict = None, headers: dict = None, cookies: dict = None):
-        with allure.step(f"DELETE request to URL '{url}'"):
+        with step(f"DELETE request to URL '{url}'"):
             return MyRequests._send(url, data, headers, cookies, "DELETE")
 
     @staticmethod
-    def _send(url: str, data: dict, headers: dict, cookies: dict, method: str):
+    def batch(specs: list, max_workers: int = None):
+        # specs: [{"method": "POST", "url": "/user", "data": {...}, "headers": {...}, "cookies": {...}}, ...]
+        # Возвращает список BatchResult в том же порядке, что и specs
+        if not specs:
+            return []
+        from concurrent.futures import ThreadPoolExecutor
+
+        methods = {
+            "GET": MyRequests.get,
+            "POST": MyRequests.post,
+            "PUT": MyRequests.put,
+            "DELETE": MyRequests.delete,
+        }
+
+        def run(spec: dict):
+            try:
+                method = spec.get("method", "GET").upper()
+                if method not in methods:
+                    raise Exception(f"Bad HTTP method '{method}' is received.")
+                options = {"fresh": True} if method == "GET" and spec.get("fresh") else {}
+                response = methods[method](
+                    spec["url"],
+                    data=spec.get("data"),
+                    headers=spec.get("headers"),
+                    cookies=spec.get("cookies"),
+                    **options
+                )
+                return BatchResult(spec, response=response)
+            except Exception as error:
+                return BatchResult(spec, error=error)
+
+        if max_workers is None:
+            max_workers = MyRequests.batch_workers
+        max_workers = max(1, min(max_workers, len(specs)))
+
+        with step(f"Batch of {len(specs)} requests"):
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="MyRequests.batch") as executor:
+                # Каждый запрос выполняется в копии контекста вызывающего кода
+                futures = []
+                for index, spec in enumerate(specs):
+                    context = contextvars.copy_context()
+                    context.run(cassette_slot.set, index)
+                    futures.append(executor.submit(context.run, run, spec))
+                return [future.result() for future in futures]
+
+    @staticmethod
+    def add_listener(callback):
+        MyRequests._listeners = MyRequests._listeners + [callback]
+
+    @staticmethod
+    def remove_listener(callback):
+        MyRequests._listeners = [listener for listener in MyRequests._listeners if listener is not callback]
+
+    @staticmethod
+    def _notify(method: str, path: str, response, duration: float, error: Exception = None):
+        for listener in MyRequests._listeners:
+            listener(method, path, response, duration, error)
+
+    @staticmethod
+    def close_sessions():
+        SessionPool.close()
 
+    @staticmethod
+    def connection_stats():
+        return SessionPool.stats()
+
+    @staticmethod
+    def _send(url: str, data: dict, headers: dict, cookies: dict, method: str, fresh: bool = False):
+
+        path = url
         url = f"{ENV_OBJECT.get_base_url()}{url}"
 
         if headers is None:
@@ -36,18 +249,98 @@ class MyRequests():
 
         Logger.add_request(url, data, headers, cookies, method)
 
+        cassette = CassetteConfig.active()
+        # Кэш не работает вместе с кассетами: запись должна содержать все запросы теста
+        use_cache = ResponseCache.enabled and cassette is None
+        timing.start()
+        started = time.perf_counter()
+
+        try:
+            if cassette is not None and cassette.mode == REPLAY:
+                response = cassette.replay(method, url, path, data, headers, cookies)
+            elif use_cache and method == "GET" and not fresh:
+                response = MyRequests._perform_cached(url, path, data, headers, cookies)
+            else:
+                response = MyRequests._perform(url, path, data, headers, cookies, method)
+                if cassette is not None:
+                    cassette.record(method, path, data, headers, cookies, response)
+        except Exception as error:
+            if MyRequests._listeners:
+                MyRequests._notify(method, path, None, time.perf_counter() - started, error)
+            raise
+        finally:
+            if use_cache and method != "GET":
+                ResponseCache.invalidate(url, headers, cookies)
+
+        duration = time.perf_counter() - started
+        if getattr(response, "from_cache", False):
+            response.timings = {"total": duration}
+        else:
+            response.timings = timing.finish(response, duration)
+        Logger.add_response(response, duration)
+        if MyRequests._listeners:
+            MyRequests._notify(method, path, response, duration)
+
+        return response
+
+    @staticmethod
+    def _perform_cached(url: str, path: str, data: dict, headers: dict, cookies: dict):
+        key = ResponseCache.make_key(url, data, headers, cookies)
+        response, validators = ResponseCache.lookup(key)
+        if response is not None:
+            return response
+        if validators:
+            # Запись устарела, но у неё есть ETag/Last-Modified: спрашиваем сервер, изменилось ли что-то
+            revalidation = MyRequests._perform(url, path, data, dict(headers, **validators), cookies, "GET")
+            return ResponseCache.revalidated(key, revalidation)
+        response = MyRequests._perform(url, path, data, headers, cookies, "GET")
+        ResponseCache.store(key, response)
+        return response
+
+    @staticmethod
+    def _perform(url: str, path: str, data: dict, headers: dict, cookies: dict, method: str):
+        # Повторы, дублирующие GET и предохранитель - см. lib/resilience.py
+        def on_retry(attempt, response, error, duration, delay):
+            reason = f"status {response.status_code}" if response is not None else f"{type(error).__name__}: {error}"
+            Logger.add_attempt(response, duration, f"attempt {attempt} failed ({reason}), retrying in {delay:.3f} s")
+
+        base_url = url[:len(url) - len(path)]
+
+        def select_target():
+            # Если базовый URL выведен из ротации, попытка уходит на другой (см. lib/base_urls.py)
+            return ENV_OBJECT.failover_url(base_url)
+
+        def perform(target: str):
+            # Каждая сетевая попытка (и дубль) проходит через общий для процессов лимит частоты
+            RateLimiter.acquire(ENV_OBJECT.env, method, path)
+            try:
+                response = MyRequests._perform_once(target + path, data, headers, cookies, method)
+            except OSError:
+                # Обрыв соединения и таймаут (исключения requests - потомки OSError)
+                ENV_OBJECT.report(target, False, reachable=False)
+                raise
+            ENV_OBJECT.report(target, response.status_code < 500, response.elapsed.total_seconds())
+            RateLimiter.observe(ENV_OBJECT.env, method, path, response)
+            return response
+
+        return Resilience.execute(method, select_target, path, perform, on_retry)
+
+    @staticmethod
+    def _perform_once(url: str, data: dict, headers: dict, cookies: dict, method: str):
+        session = SessionPool.get_session()
+        stream = MyRequests.stream
+
         if method == "GET":
-            response = requests.get(url, params=data, headers=headers, cookies=cookies)
+            response = session.get(url, params=data, headers=headers, cookies=cookies, stream=stream)
         elif method == "POST":
-            response = requests.post(url, data=data, headers=headers, cookies=cookies)
+            response = session.post(url, data=data, headers=headers, cookies=cookies, stream=stream)
         elif method == "PUT":
-            response = requests.put(url, data=data, headers=headers, cookies=cookies)
+            response = session.put(url, data=data, headers=headers, cookies=cookies, stream=stream)
         elif method == "DELETE":
-            response = requests.delete(url, data=data, headers=headers, cookies=cookies)
+            response = session.delete(url, data=data, headers=headers, cookies=cookies, stream=stream)
         else:
             raise Exception(f"Bad HTTP method '{method}' is received.")
 
-        Logger.add_response(response)
-
+        if stream:
+            read_streamed(response, MyRequests.max_body_bytes)
         return response
-
@@ -0,0 +1,125 @@
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import xml.etree.ElementTree as ElementTree
+from lib.cassette import RECORD, CassetteConfig, clear_exchanges
+from lib.sharding import DURATIONS_FILE, merge_worker_durations
+
+# Параллельный запуск тестов: процессы на одной машине и шарды на нескольких машинах.
+# Тесты делятся по сохранённым длительностям (lib/sharding.py), у каждого процесса
+# свой LEARNQA_WORKER, а значит свои файлы логов и свои email в тестовых данных.
+#
+# Одна машина, 4 процесса:
+#   python -m lib.parallel -n 4 -- tests/
+# Три машины по 4 процесса (на каждой свой --node-index):
+#   python -m lib.parallel -n 4 --nodes 3 --node-index 0 -- tests/
+# Отчёты процессов сливаются в reports/junit.xml (с нескольких машин:
+#   python -m lib.parallel --merge reports/ node1/reports/ node2/reports/)
+# Для allure достаточно передать всем процессам одну и ту же папку: -- --alluredir=test_results
+# Длительности для следующих разбиений сохраняются только по запросу (на нужном окружении):
+#   ENV=dev python -m lib.parallel -n 4 --store-durations -- tests/
+
+REPORTS_DIR = "reports"
+
+
+def merge_junit(sources: list, target: str):
+    merged = ElementTree.Element("testsuites")
+    totals = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0}
+    total_time = 0.0
+
+    for source in sources:
+        root = ElementTree.parse(source).getroot()
+        suites = [root] if root.tag == "testsuite" else list(root)
+        for suite in suites:
+            merged.append(suite)
+            for name in totals:
+                totals[name] += int(suite.get(name, 0))
+            total_time += float(suite.get("time", 0))
+
+    for name, value in totals.items():
+        merged.set(name, str(value))
+    merged.set("time", f"{total_time:.3f}")
+
+    directory = os.path.dirname(target)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    ElementTree.ElementTree(merged).write(target, encoding="utf-8", xml_declaration=True)
+    return totals
+
+
+def run(workers: int, nodes: int, node_index: int, pytest_args: list, reports_dir: str, durations_file: str,
+        store_durations: bool = False):
+    num_shards = workers * nodes
+    os.makedirs(reports_dir, exist_ok=True)
+    if CassetteConfig.mode == RECORD:
+        # Процессы пишут кассету в отдельные файлы, старые файлы всех процессов удаляются один раз здесь
+        clear_exchanges(CassetteConfig.directory)
+
+    processes = []
+    for local_index in range(workers):
+        shard_id = node_index * workers + local_index
+        junit_file = os.path.join(reports_dir, f"junit-{shard_id}.xml")
+        command = [
+            sys.executable, "-m", "pytest",
+            "--shard-id", str(shard_id),
+            "--num-shards", str(num_shards),
+            "--durations-file", durations_file,
+            f"--junitxml={junit_file}",
+            "-p", "no:cacheprovider",
+        ] + (["--store-durations"] if store_durations else []) + pytest_args
+        environment = dict(os.environ, LEARNQA_WORKER=f"w{shard_id}")
+        output = open(os.path.join(reports_dir, f"output-{shard_id}.txt"), 'w', encoding='utf-8')
+        processes.append((shard_id, subprocess.Popen(command, env=environment, stdout=output, stderr=subprocess.STDOUT), output, junit_file))
+
+    exit_codes = {}
+    junit_files = []
+    for shard_id, process, output, junit_file in processes:
+        exit_codes[shard_id] = process.wait()
+        output.close()
+        if os.path.exists(junit_file):
+            junit_files.append(junit_file)
+
+    if store_durations:
+        merge_worker_durations(durations_file)
+    totals = merge_junit(junit_files, os.path.join(reports_dir, "junit.xml")) if junit_files else None
+
+    for shard_id, exit_code in sorted(exit_codes.items()):
+        print(f"shard {shard_id + 1}/{num_shards}: exit code {exit_code}, output in {reports_dir}/output-{shard_id}.txt")
+    if totals is not None:
+        print(f"tests: {totals['tests']}, failures: {totals['failures']}, errors: {totals['errors']}, "
+              f"skipped: {totals['skipped']} -> {os.path.join(reports_dir, 'junit.xml')}")
+
+    # pytest: 0 - всё прошло, 5 - в шарде нет тестов (это не ошибка при большом числе шардов)
+    failed = [code for code in exit_codes.values() if code not in (0, 5)]
+    return failed[0] if failed else 0
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(prog="python -m lib.parallel", description="Run the suite in duration-balanced shards")
+    parser.add_argument("-n", "--workers", type=int, default=os.cpu_count() or 1, help="processes on this machine")
+    parser.add_argument("--nodes", type=int, default=1, help="number of machines")
+    parser.add_argument("--node-index", type=int, default=0, help="index of this machine, from 0")
+    parser.add_argument("--reports-dir", default=REPORTS_DIR)
+    parser.add_argument("--durations-file", default=DURATIONS_FILE)
+    parser.add_argument("--store-durations", action="store_true", help="save durations of this run for later splits")
+    parser.add_argument("--merge", nargs="+", metavar="DIR", help="only merge junit-*.xml from these dirs into the first one")
+    parser.add_argument("pytest_args", nargs="*", help="arguments for pytest (after --)")
+    args = parser.parse_args(argv)
+
+    if args.merge:
+        target_dir = args.merge[0]
+        sources = sorted(set(file_name for directory in args.merge for file_name in glob.glob(os.path.join(directory, "junit-*.xml"))))
+        totals = merge_junit(sources, os.path.join(target_dir, "junit.xml"))
+        print(f"tests: {totals['tests']}, failures: {totals['failures']}, errors: {totals['errors']}, skipped: {totals['skipped']}")
+        return 0
+
+    if not 0 <= args.node_index < args.nodes:
+        parser.error(f"--node-index must be between 0 and {args.nodes - 1}")
+    return run(args.workers, args.nodes, args.node_index, args.pytest_args, args.reports_dir, args.durations_file,
+               args.store_durations)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
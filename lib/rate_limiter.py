@@ -0,0 +1,236 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from lib.endpoints import template_path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Ограничение частоты запросов к API, общее для всех процессов на машине (воркеры
+# lib.parallel, pytest-xdist): состояние "ведра с жетонами" лежит в файле, отображённом
+# в память, доступ к нему - под блокировкой файла.
+#
+# Лимиты (запросов в секунду) задаются по окружению и эндпоинту, "*" - все запросы окружения:
+#   export MYREQUESTS_RATE_LIMITS='{"dev": {"*": 20, "POST /user": 5}, "prod": {"*": 10}}'
+# или одним числом для текущего окружения: export MYREQUESTS_RATE_LIMIT=20
+# Без настройки ограничения нет.
+#
+# Ответ 429 вдвое снижает частоту (не ниже min_rate) и, если есть Retry-After, задерживает
+# все процессы до указанного времени; успешные ответы постепенно возвращают частоту к лимиту.
+# Кроме того, частота восстанавливается со временем: от минимума до полного лимита за
+# recovery секунд с последнего снижения. Файл ведра общий для всех запусков на машине
+# (два CI-задания или нагрузка рядом с pytest делят один лимит), и снижение после 429
+# прошлого прогона к следующему прогону уже выветривается:
+#   export MYREQUESTS_RATE_RECOVERY=60
+
+_STATE = struct.Struct("ddddd")  # жетоны, время обновления, текущая частота, пауза до, время последнего снижения
+
+
+def _load_limits():
+    limits = json.loads(os.environ.get('MYREQUESTS_RATE_LIMITS', '{}'))
+    if 'MYREQUESTS_RATE_LIMIT' in os.environ:
+        env = os.environ.get('ENV', 'dev')
+        limits.setdefault(env, {})["*"] = float(os.environ['MYREQUESTS_RATE_LIMIT'])
+    return limits
+
+
+def retry_after(response):
+    # Секунды из заголовка Retry-After (число или дата HTTP), None - заголовка нет
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        # Retry-After может быть датой HTTP
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+class SharedBucket:
+    def __init__(self, file_name: str, max_rate: float, burst: float, min_rate: float, recovery: float = 60.0):
+        self.file_name = file_name
+        self.max_rate = max_rate
+        self.capacity = max(max_rate * burst, 1.0)
+        self.min_rate = min(min_rate, max_rate)
+        self.recovery = recovery
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._map = None
+
+    def _open(self):
+        # После fork дескриптор общий с родителем, а блокировка файла тогда не разделяет процессы
+        if self._pid == os.getpid():
+            return
+        directory = os.path.dirname(self.file_name)
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.file_name, 'a+b')
+        if os.path.getsize(self.file_name) < _STATE.size:
+            self._file.truncate(_STATE.size)
+        self._map = mmap.mmap(self._file.fileno(), _STATE.size)
+        self._pid = os.getpid()
+
+    def _update(self, change):
+        # change(state, now) -> результат; state: {"tokens", "rate", "blocked_until", "decreased_at"}
+        with self._lock:
+            self._open()
+            self._lock_file()
+            try:
+                tokens, updated, rate, blocked_until, decreased_at = _STATE.unpack(self._map[:_STATE.size])
+                now = time.time()
+                if rate <= 0 or rate > self.max_rate:
+                    # Новый файл или уменьшенный лимит
+                    tokens, updated, rate = self.capacity, now, self.max_rate
+                elif rate < self.max_rate:
+                    rate = self._recovered(rate, updated, decreased_at, now)
+                state = {
+                    "tokens": min(self.capacity, tokens + max(now - updated, 0.0) * rate),
+                    "rate": rate,
+                    "blocked_until": blocked_until,
+                    "decreased_at": decreased_at,
+                }
+                result = change(state, now)
+                self._map[:_STATE.size] = _STATE.pack(
+                    state["tokens"], now, state["rate"], state["blocked_until"], state["decreased_at"]
+                )
+                return result
+            finally:
+                self._unlock_file()
+
+    def _recovered(self, rate: float, updated: float, decreased_at: float, now: float):
+        # Прибавка за время с прошлого обновления, но не раньше последнего снижения:
+        # весь путь от нуля до max_rate занимает recovery секунд
+        if self.recovery <= 0:
+            return self.max_rate
+        elapsed = max(now - max(updated, decreased_at), 0.0)
+        return min(rate + self.max_rate * elapsed / self.recovery, self.max_rate)
+
+    def _lock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def reserve(self):
+        # Берёт жетон (в долг, если их нет) и возвращает, сколько секунд подождать
+        def change(state, now):
+            state["tokens"] -= 1
+            return max(state["blocked_until"] - now, 0.0) + max(-state["tokens"], 0.0) / state["rate"]
+
+        return self._update(change)
+
+    def throttled(self, pause: float = None):
+        def change(state, now):
+            # Пачка одновременных 429 - это один сигнал: частота снижается не чаще раза в секунду
+            if now - state["decreased_at"] >= 1.0:
+                state["rate"] = max(state["rate"] / 2, self.min_rate)
+                state["decreased_at"] = now
+            if pause is not None:
+                state["blocked_until"] = max(state["blocked_until"], now + pause)
+            state["tokens"] = min(state["tokens"], 0.0)
+            return state["rate"]
+
+        return self._update(change)
+
+    def succeeded(self):
+        def change(state, now):
+            state["rate"] = min(state["rate"] + self.max_rate * 0.02, self.max_rate)
+            return state["rate"]
+
+        return self._update(change)
+
+    def current_rate(self):
+        return self._update(lambda state, now: state["rate"])
+
+
+class RateLimiter:
+    limits = _load_limits()
+    # Запас жетонов в секундах работы на полном лимите и нижняя граница частоты после 429
+    burst = float(os.environ.get('MYREQUESTS_RATE_BURST', 1))
+    min_rate = float(os.environ.get('MYREQUESTS_RATE_MIN', 0.5))
+    directory = os.environ.get('MYREQUESTS_RATE_DIR', os.path.join(tempfile.gettempdir(), "learnqa-rate-limits"))
+    recovery = float(os.environ.get('MYREQUESTS_RATE_RECOVERY', 60))
+
+    _buckets = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, env: str, endpoint: str = "*", rate: float = None):
+        # rate=None - снять ограничение
+        with cls._lock:
+            limits = {name: dict(values) for name, values in cls.limits.items()}
+            if rate is None:
+                limits.get(env, {}).pop(endpoint, None)
+            else:
+                limits.setdefault(env, {})[endpoint] = rate
+            cls.limits = limits
+            cls._buckets = {}
+
+    @classmethod
+    def _get_buckets(cls, env: str, method: str, path: str):
+        env_limits = cls.limits.get(env)
+        if not env_limits:
+            return []
+        endpoint = f"{method} {template_path(path)}"
+        buckets = []
+        for name in ("*", endpoint):
+            rate = env_limits.get(name)
+            if not rate:
+                continue
+            key = (env, name)
+            bucket = cls._buckets.get(key)
+            if bucket is None:
+                file_name = os.path.join(cls.directory, f"{env}_{cls._file_part(name)}.bucket")
+                with cls._lock:
+                    bucket = cls._buckets.setdefault(key, SharedBucket(file_name, rate, cls.burst, cls.min_rate, cls.recovery))
+            buckets.append(bucket)
+        return buckets
+
+    @staticmethod
+    def _file_part(endpoint: str):
+        if endpoint == "*":
+            return "all"
+        return "".join(char if char.isalnum() else "_" for char in endpoint).strip("_")
+
+    @classmethod
+    def acquire(cls, env: str, method: str, path: str):
+        # Ждёт своей очереди во всех подходящих вёдрах; возвращает время ожидания
+        waited = 0.0
+        for bucket in cls._get_buckets(env, method, path):
+            wait = bucket.reserve()
+            if wait > 0:
+                time.sleep(wait)
+                waited += wait
+        return waited
+
+    @classmethod
+    def observe(cls, env: str, method: str, path: str, response):
+        buckets = cls._get_buckets(env, method, path)
+        if not buckets:
+            return
+        if response.status_code == 429:
+            pause = retry_after(response)
+            for bucket in buckets:
+                bucket.throttled(pause)
+        else:
+            for bucket in buckets:
+                bucket.succeeded()
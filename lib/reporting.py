@@ -0,0 +1,117 @@
+import contextvars
+import hashlib
+import json
+import os
+
+# Режим отчёта allure для MyRequests и шагов тестов:
+#   export REPORTING_MODE=full     - шаг allure на каждый запрос и на каждый step() теста (по умолчанию)
+#   export REPORTING_MODE=summary  - без шагов; одно вложение на тест со сводкой запросов
+#   export REPORTING_MODE=off      - без шагов и вложений: MyRequests и step() не вызывают allure
+#                                    (сам пакет всё равно импортируют conftest и модули тестов ради декораторов)
+#
+# В тестах шаги пишутся через step() из этого модуля, а не через allure.step:
+#   with step("It registers the user"):
+#       ...
+# Сводка summary собирается подписчиком MyRequests (см. фикстуру request_report в tests/conftest.py)
+# и прикладывается к телу теста в pytest_runtest_makereport после фазы call: вложение из
+# teardown фикстуры allure показал бы в разделе фикстуры. Запросы из teardown в сводку не попадают.
+# Запросы из MyRequests.batch попадают в сводку теста, фоновые запросы UserPool - нет.
+
+FULL = "full"
+SUMMARY = "summary"
+OFF = "off"
+MODES = (FULL, SUMMARY, OFF)
+
+
+class _NoStep:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_STEP = _NoStep()
+
+_records = contextvars.ContextVar("report_records", default=None)
+
+
+def _digest(content):
+    if not content:
+        return None
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+class Reporting:
+    mode = os.environ.get('REPORTING_MODE', FULL)
+
+    @classmethod
+    def configure(cls, mode: str):
+        if mode not in MODES:
+            raise ValueError(f"Unknown reporting mode '{mode}', expected one of {MODES}")
+        cls.mode = mode
+
+    @classmethod
+    def step(cls, title: str):
+        if cls.mode != FULL:
+            return _NO_STEP
+        import allure
+        return allure.step(title)
+
+    @classmethod
+    def start_test(cls):
+        # Возвращает токен для finish_test; вне режима summary запросы не собираются
+        if cls.mode != SUMMARY:
+            return None
+        return _records.set([])
+
+    @classmethod
+    def attach_summary(cls):
+        # Вызывается после фазы call теста; повторный вызов ничего не прикладывает
+        records = _records.get()
+        if not records:
+            return
+        _records.set([])
+        import allure
+        allure.attach(cls.summary(records), "HTTP requests", allure.attachment_type.JSON)
+
+    @classmethod
+    def finish_test(cls, token):
+        if token is not None:
+            _records.reset(token)
+
+    @staticmethod
+    def on_request(method: str, path: str, response, duration: float, error: Exception = None):
+        # Подписчик MyRequests (см. MyRequests.add_listener)
+        records = _records.get()
+        if records is None:
+            return
+        record = {"method": method, "path": path, "duration_ms": round(duration * 1000, 3)}
+        if error is not None:
+            record["error"] = repr(error)
+        if response is not None:
+            body = getattr(response, "body", None)
+            record["status"] = response.status_code
+            request = getattr(response, "request", None)
+            record["request_sha256"] = _digest(request.body if request is not None else None)
+            if body is not None:
+                record["response_length"] = body.length
+                record["response_sha256"] = body.sha256[:16]
+            else:
+                record["response_length"] = len(response.content)
+                record["response_sha256"] = _digest(response.content)
+            for name in ("from_cache", "retries", "hedged"):
+                if getattr(response, name, None):
+                    record[name] = getattr(response, name)
+        records.append(record)
+
+    @staticmethod
+    def summary(records: list):
+        total = sum(record["duration_ms"] for record in records)
+        return json.dumps({"requests": len(records), "total_ms": round(total, 3), "items": records}, indent=2)
+
+
+def step(title: str):
+    return Reporting.step(title)
@@ -0,0 +1,302 @@
+import json
+import os
+import random
+import threading
+import time
+from lib import timing
+from lib.endpoints import template_path
+from lib.rate_limiter import retry_after
+
+# Повторы, дублирующие (hedged) запросы и предохранитель для MyRequests._send.
+# По умолчанию всё выключено: в функциональном прогоне 5xx тестируемого API - это результат
+# теста, а не помеха, которую нужно скрыть повтором. Нагрузочные и CI-прогоны включают нужное.
+#
+# Повторяются только идемпотентные методы (GET, PUT, DELETE) - при обрыве соединения,
+# таймауте и ответах из retry_statuses, с экспоненциальной задержкой со случайным
+# разбросом ("full jitter"). POST повторяется только после 429: такой запрос сервер
+# не обработал. Задержка после 429 не меньше Retry-After.
+#   export MYREQUESTS_RETRIES=2 MYREQUESTS_BACKOFF=0.1 MYREQUESTS_BACKOFF_MAX=2   (по умолчанию 0)
+#   export MYREQUESTS_RETRY_STATUSES=429,502,503,504
+#
+# Переключение адреса (lib/base_urls.py): если соединение с базовым URL не удалось, а в
+# окружении есть другой живой адрес, запрос один раз повторяется на нём - даже при retries=0.
+# Для POST - только если соединение не было установлено и сервер запроса не видел.
+#
+# Hedging: если GET не ответил за hedge_after секунд, отправляется второй такой же
+# запрос, берётся первый ответ (0 - выключено): export MYREQUESTS_HEDGE_AFTER=0.5
+#
+# Предохранитель на базовый URL: после breaker_failures сбоев подряд (обрыв или 5xx)
+# запросы к нему сразу падают с CircuitOpenError, через breaker_reset секунд пропускается
+# один пробный запрос, остальные до его исхода тоже получают CircuitOpenError
+# (0 - выключено, по умолчанию): export MYREQUESTS_BREAKER_FAILURES=5 MYREQUESTS_BREAKER_RESET=30
+#
+# Политику можно задать для метода и шаблона пути:
+#   Resilience.set_policy("GET", "/user/{id}", hedge_after=0.3)
+#   export MYREQUESTS_POLICIES='{"GET /user/{id}": {"hedge_after": 0.3}, "GET *": {"retries": 2}}'
+
+IDEMPOTENT_METHODS = {"GET", "PUT", "DELETE"}
+
+
+def _retry_errors():
+    # Обрыв соединения и таймаут; requests к этому моменту уже загружен первым запросом
+    import requests
+    return requests.ConnectionError, requests.Timeout
+
+
+def _not_sent(error: Exception):
+    # Соединение не установлено (отказ или таймаут подключения): запрос до сервера не дошёл
+    import requests
+    from urllib3.exceptions import NewConnectionError
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class Policy:
+    def __init__(self, retries: int = 0, backoff: float = 0.1, backoff_max: float = 2.0,
+                 retry_statuses: tuple = (429, 502, 503, 504), hedge_after: float = 0):
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.retry_statuses = set(retry_statuses)
+        self.hedge_after = hedge_after
+
+    def updated(self, **options):
+        policy = Policy(self.retries, self.backoff, self.backoff_max, tuple(self.retry_statuses), self.hedge_after)
+        for name, value in options.items():
+            if not hasattr(policy, name):
+                raise Exception(f"Unknown request policy option '{name}'")
+            setattr(policy, name, set(value) if name == "retry_statuses" else value)
+        return policy
+
+    def delay(self, attempt: int):
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+        self._lock = threading.Lock()
+
+    def before_request(self, target: str):
+        if not self.failure_threshold:
+            return
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError(
+                        f"Circuit breaker for {target} is open after {self.failures} failures in a row, "
+                        f"next try in {self.reset_timeout - (time.monotonic() - self.opened_at):.1f} s"
+                    )
+                # Пробный запрос: его результат решает, закрыть предохранитель или открыть снова
+                self.state = self.HALF_OPEN
+                self.probe_started_at = time.monotonic()
+                return
+            if self.state == self.HALF_OPEN:
+                # Пока идёт пробный запрос, остальные не пропускаются. Если проба так и не
+                # сообщила исход (упала с посторонним исключением), через reset_timeout - новая проба
+                if time.monotonic() - self.probe_started_at < self.reset_timeout:
+                    raise CircuitOpenError(f"Circuit breaker for {target} is half-open, a probe request is in flight")
+                self.probe_started_at = time.monotonic()
+
+    def record(self, success: bool):
+        if not self.failure_threshold:
+            return
+        with self._lock:
+            if success:
+                self.state = self.CLOSED
+                self.failures = 0
+                self.probe_started_at = None
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+def _policy_from_environment():
+    statuses = os.environ.get('MYREQUESTS_RETRY_STATUSES', '429,502,503,504')
+    return Policy(
+        retries=int(os.environ.get('MYREQUESTS_RETRIES', 0)),
+        backoff=float(os.environ.get('MYREQUESTS_BACKOFF', 0.1)),
+        backoff_max=float(os.environ.get('MYREQUESTS_BACKOFF_MAX', 2)),
+        retry_statuses=tuple(int(status) for status in statuses.split(",") if status.strip()),
+        hedge_after=float(os.environ.get('MYREQUESTS_HEDGE_AFTER', 0)),
+    )
+
+
+class Resilience:
+    default_policy = _policy_from_environment()
+    breaker_failures = int(os.environ.get('MYREQUESTS_BREAKER_FAILURES', 0))
+    breaker_reset = float(os.environ.get('MYREQUESTS_BREAKER_RESET', 30))
+    hedge_workers = int(os.environ.get('MYREQUESTS_HEDGE_WORKERS', 20))
+
+    _policies = {}
+    _breakers = {}
+    _lock = threading.Lock()
+    _executor = None
+
+    @classmethod
+    def set_policy(cls, method: str = "*", path: str = "*", **options):
+        # path - шаблон пути, как в template_path: "/user/{id}"
+        key = (method.upper(), path)
+        with cls._lock:
+            base = cls._policies.get(key, cls.default_policy)
+            cls._policies[key] = base.updated(**options)
+
+    @classmethod
+    def policy(cls, method: str, path: str):
+        template = template_path(path)
+        for key in ((method, template), (method, "*"), ("*", template), ("*", "*")):
+            policy = cls._policies.get(key)
+            if policy is not None:
+                return policy
+        return cls.default_policy
+
+    @classmethod
+    def breaker(cls, target: str):
+        with cls._lock:
+            breaker = cls._breakers.get(target)
+            if breaker is None:
+                breaker = cls._breakers[target] = CircuitBreaker(cls.breaker_failures, cls.breaker_reset)
+            return breaker
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._policies = {}
+            cls._breakers = {}
+
+    @classmethod
+    def execute(cls, method: str, select_target, path: str, perform, on_retry=None):
+        # select_target() -> базовый URL очередной попытки (с учётом переключения адресов,
+        # см. lib/base_urls.py); он же ключ предохранителя. perform(target) - один сетевой вызов.
+        # on_retry(attempt, response, error, duration, delay) вызывается перед каждым повтором.
+        # Возвращает ответ с атрибутами retries и hedged
+        policy = cls.policy(method, path)
+        idempotent = method in IDEMPOTENT_METHODS
+        hedge_after = policy.hedge_after if method == "GET" else 0
+        retry_errors = _retry_errors()
+        attempt = 0
+        failed_over = False
+        next_target = None
+
+        while True:
+            target = next_target or select_target()
+            next_target = None
+            breaker = cls.breaker(target)
+            breaker.before_request(target)
+            started = time.perf_counter()
+            hedged = [False]
+            try:
+                if hedge_after:
+                    response = cls._hedged(lambda: perform(target), hedge_after, hedged)
+                else:
+                    response = perform(target)
+            except retry_errors as error:
+                breaker.record(False)
+                if not failed_over and (idempotent or _not_sent(error)):
+                    # perform уже вывел адрес из ротации, select_target() даст другой, если он есть
+                    alternative = select_target()
+                    if alternative != target:
+                        failed_over = True
+                        next_target = alternative
+                        if on_retry is not None:
+                            on_retry(attempt + 1, None, error, time.perf_counter() - started, 0.0)
+                        timing.start()
+                        continue
+                if not idempotent or attempt >= policy.retries:
+                    raise
+                response, failure = None, error
+            else:
+                breaker.record(response.status_code < 500)
+                retryable = response.status_code in policy.retry_statuses and (idempotent or response.status_code == 429)
+                if not retryable or attempt >= policy.retries:
+                    response.retries = attempt + failed_over
+                    response.hedged = hedged[0]
+                    return response
+                failure = None
+
+            attempt += 1
+            delay = policy.delay(attempt)
+            if response is not None and response.status_code == 429:
+                delay = max(delay, retry_after(response) or 0.0)
+            if on_retry is not None:
+                on_retry(attempt, response, failure, time.perf_counter() - started, delay)
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+            timing.start()
+
+    @classmethod
+    def _get_executor(cls):
+        from concurrent.futures import ThreadPoolExecutor
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=cls.hedge_workers, thread_name_prefix="MyRequests.hedge")
+        return cls._executor
+
+    @classmethod
+    def _hedged(cls, perform, hedge_after: float, hedged: list):
+        from concurrent.futures import FIRST_COMPLETED, wait
+        # Первый запрос и дубль выполняются в пуле потоков; фазы времени победителя
+        # переносятся в поток вызывающего кода
+        def run():
+            timing.start()
+            response = perform()
+            return response, timing.snapshot()
+
+        executor = cls._get_executor()
+        primary = executor.submit(run)
+        futures = [primary]
+        done, _ = wait(futures, timeout=hedge_after)
+        if not done:
+            hedged[0] = True
+            futures.append(executor.submit(run))
+
+        error = None
+        while futures:
+            done, pending = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.add_done_callback(_close_response)
+                    response, timings = future.result()
+                    timing.adopt(timings)
+                    response.hedge_won = future is not primary
+                    return response
+                error = error or future.exception()
+            futures = list(pending)
+        raise error
+
+
+def _close_response(future):
+    if future.exception() is None:
+        future.result()[0].close()
+
+
+def _load_policies_from_environment():
+    raw = os.environ.get('MYREQUESTS_POLICIES')
+    if not raw:
+        return
+    for key, options in json.loads(raw).items():
+        method, path = key.split(" ", 1)
+        Resilience.set_policy(method, path, **options)
+
+
+_load_policies_from_environment()
@@ -0,0 +1,151 @@
+import hashlib
+import os
+
+# Потоковое чтение тела ответа (MyRequests.stream = True или export MYREQUESTS_STREAM=1).
+#
+# Тело читается кусками один раз: считаются длина и sha256, запоминается начало для лога,
+# а само тело складывается во временный файл, который держится в памяти до spool_bytes
+# и дальше уходит на диск. Ответ длиннее max_bytes прерывается с BodyTooLargeError, а если
+# длину заранее объявляет Content-Length - ещё до чтения тела.
+# Logger пишет только начало тела, длину и хэш, а Assertions.assert_content сравнивает
+# тело по кускам.
+#
+# Ограничение: response.content / .text / .json() работают как обычно, но requests
+# читает тело из файла целиком в память. Память экономится, только пока тест обходится
+# response.body (iter_chunks, equals, describe) и не трогает content.
+# Временный файл закрывается вместе с ответом (response.close()) или при ошибке чтения;
+# после закрытия тело доступно только через уже прочитанный response.content.
+
+CHUNK_SIZE = 64 * 1024
+
+
+class BodyTooLargeError(Exception):
+    pass
+
+
+class StreamedBody:
+    preview_bytes = int(os.environ.get('LOG_BODY_PREVIEW_BYTES', 2048))
+    spool_bytes = int(os.environ.get('MYREQUESTS_SPOOL_BYTES', 1024 * 1024))
+
+    def __init__(self):
+        import tempfile
+        self.length = 0
+        self._sha256 = hashlib.sha256()
+        self._preview = bytearray()
+        self._file = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+
+    def write(self, chunk: bytes):
+        self.length += len(chunk)
+        self._sha256.update(chunk)
+        if len(self._preview) < self.preview_bytes:
+            self._preview += chunk[:self.preview_bytes - len(self._preview)]
+        self._file.write(chunk)
+
+    def close(self):
+        self._file.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+    @property
+    def preview(self):
+        return bytes(self._preview)
+
+    @property
+    def truncated(self):
+        return self.length > len(self._preview)
+
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE):
+        if self.closed:
+            raise ValueError("Streamed response body is closed")
+        self._file.seek(0)
+        while True:
+            chunk = self._file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def equals(self, expected: bytes):
+        if self.length != len(expected):
+            return False
+        position = 0
+        for chunk in self.iter_chunks():
+            if expected[position:position + len(chunk)] != chunk:
+                return False
+            position += len(chunk)
+        return True
+
+    def describe(self, encoding: str = "utf-8"):
+        text = self.preview.decode(encoding or "utf-8", errors="replace")
+        if self.truncated:
+            text += f"... [truncated: {self.length} bytes, sha256 {self.sha256}]"
+        return text
+
+    def reader(self):
+        # Объект для response.raw: requests дочитает из него тело при обращении к content
+        return _BodyReader(self)
+
+
+class _BodyReader:
+    # Своя позиция чтения: equals/iter_chunks между чтениями не сбивают content
+    def __init__(self, body: StreamedBody):
+        self._body = body
+        self._position = 0
+
+    def read(self, size: int = -1, *args, **kwargs):
+        file = self._body._file
+        file.seek(self._position)
+        chunk = file.read(size)
+        self._position += len(chunk)
+        return chunk
+
+    def close(self):
+        self._body.close()
+
+    def release_conn(self):
+        # response.close() вызывает close() только для недочитанного ответа, release_conn() - всегда
+        self._body.close()
+
+
+def read_streamed(response, max_bytes: int):
+    # response получен с stream=True; после чтения соединение возвращается в пул
+    too_large = f"Response body of {response.request.method} {response.url} is larger than {max_bytes} bytes"
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        response.close()
+        raise BodyTooLargeError(too_large)
+
+    body = StreamedBody()
+    try:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if body.length + len(chunk) > max_bytes:
+                raise BodyTooLargeError(too_large)
+            body.write(chunk)
+    except BaseException:
+        body.close()
+        raise
+    finally:
+        response.close()
+
+    response.raw = body.reader()
+    response._content = False
+    response._content_consumed = False
+    response.body = body
+    return response
+
+
+def describe_body(response, limit: int):
+    # Тело для лога: целиком, если оно не длиннее limit байт, иначе начало, длина и sha256
+    body = getattr(response, "body", None)
+    if body is not None:
+        return body.describe(response.encoding)
+    text = response.text
+    if limit and len(text) > limit:
+        content = response.content
+        text = text[:limit] + f"... [truncated: {len(content)} bytes, sha256 {hashlib.sha256(content).hexdigest()}]"
+    return text
@@ -0,0 +1,153 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+# Кэш ответов на GET-запросы MyRequests (по умолчанию выключен):
+#   export MYREQUESTS_CACHE=1 MYREQUESTS_CACHE_TTL=30 MYREQUESTS_CACHE_SIZE=256
+#
+# Ключ: URL + параметры + авторизация (cookie auth_sid и заголовок x-csrf-token).
+# Свежая запись отдаётся без запроса; устаревшая с ETag/Last-Modified
+# перепроверяется условным запросом (304 - запись снова свежая). PUT/DELETE/POST
+# через MyRequests сбрасывают записи того же пути и той же авторизации: API меняет
+# пользователя из сессии, а не из пути. Если проверяется именно свежесть данных,
+# кэш обходится: MyRequests.get(url, ..., fresh=True).
+
+_AUTH_NAMES = ("auth_sid", "x-csrf-token")
+
+
+def _auth_key(headers: dict, cookies: dict):
+    values = {name.lower(): value for name, value in list(headers.items()) + list(cookies.items())}
+    return tuple(values.get(name) for name in _AUTH_NAMES)
+
+
+def _path(url: str):
+    return urlsplit(url).path.rstrip("/")
+
+
+class CacheEntry:
+    def __init__(self, response, auth: tuple):
+        self.response = response
+        self.auth = auth
+        self.path = _path(response.url)
+        self.stored_at = time.monotonic()
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+
+    def is_fresh(self, ttl: float):
+        return time.monotonic() - self.stored_at < ttl
+
+    def validators(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def copy_response(self):
+        # Каждый вызов получает свой объект: у ответа есть изменяемые атрибуты (timings, кэш JSON)
+        response = copy.copy(self.response)
+        response.from_cache = True
+        return response
+
+
+class ResponseCache:
+    enabled = os.environ.get('MYREQUESTS_CACHE', '0') == '1'
+    ttl = float(os.environ.get('MYREQUESTS_CACHE_TTL', 30))
+    max_entries = int(os.environ.get('MYREQUESTS_CACHE_SIZE', 256))
+
+    _lock = threading.Lock()
+    _entries = OrderedDict()
+    _stats = {"hits": 0, "revalidated": 0, "misses": 0, "invalidated": 0}
+
+    @classmethod
+    def configure(cls, enabled: bool = None, ttl: float = None, max_entries: int = None):
+        if enabled is not None:
+            cls.enabled = enabled
+        if ttl is not None:
+            cls.ttl = ttl
+        if max_entries is not None:
+            cls.max_entries = max_entries
+        cls.clear()
+
+    @staticmethod
+    def make_key(url: str, params: dict, headers: dict, cookies: dict):
+        params_key = tuple(sorted((str(name), str(value)) for name, value in (params or {}).items()))
+        return url, params_key, _auth_key(headers, cookies)
+
+    @classmethod
+    def lookup(cls, key: tuple):
+        # -> (ответ из кэша или None, заголовки для условного запроса или None)
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                cls._stats["misses"] += 1
+                return None, None
+            cls._entries.move_to_end(key)
+            if entry.is_fresh(cls.ttl):
+                cls._stats["hits"] += 1
+                return entry.copy_response(), None
+            validators = entry.validators()
+            if not validators:
+                del cls._entries[key]
+                cls._stats["misses"] += 1
+                return None, None
+            return None, validators
+
+    @classmethod
+    def store(cls, key: tuple, response):
+        # Кэшируются только успешные ответы, которые сервер не запретил сохранять
+        if response.status_code != 200 or "no-store" in response.headers.get("Cache-Control", ""):
+            return
+        if getattr(response, "body", None) is not None:
+            # Потоковый ответ read_streamed уже прочитал целиком, но тело лежит во временном
+            # файле, который закроется вместе с ответом: для кэша оно сразу читается в память,
+            # а копии записи (copy_response) получают только content, без body
+            if response.body.closed:
+                return
+            response.content
+        with cls._lock:
+            cls._entries[key] = CacheEntry(response, key[2])
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > cls.max_entries:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def revalidated(cls, key: tuple, response):
+        # Ответ на условный запрос: 304 - запись снова свежая, иначе - новая запись
+        if response.status_code != 304:
+            cls.store(key, response)
+            return response
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                return response
+            entry.stored_at = time.monotonic()
+            cls._stats["revalidated"] += 1
+            return entry.copy_response()
+
+    @classmethod
+    def invalidate(cls, url: str, headers: dict, cookies: dict):
+        path = _path(url)
+        auth = _auth_key(headers, cookies)
+        with cls._lock:
+            stale = [
+                key for key, entry in cls._entries.items()
+                if entry.path == path or (any(auth) and entry.auth == auth)
+            ]
+            for key in stale:
+                del cls._entries[key]
+            cls._stats["invalidated"] += len(stale)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return dict(cls._stats, entries=len(cls._entries))
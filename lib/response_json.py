@@ -0,0 +1,29 @@
+from __future__ import annotations
+import json
+import threading
+import weakref
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from requests import Response
+
+# Разобранное тело ответа кэшируется на время жизни объекта Response:
+# все JSON-хелперы Assertions и BaseCase декодируют тело только один раз.
+# Ключи слабые, поэтому кэш не удерживает ответы в памяти.
+_cache = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_response_json(response: Response):
+    with _lock:
+        if response in _cache:
+            return _cache[response]
+
+    try:
+        response_as_dict = response.json()
+    except json.JSONDecodeError:
+        assert False, f"Response is not in JSON format. Response text is '{response.text}'"
+
+    with _lock:
+        _cache[response] = response_as_dict
+    return response_as_dict
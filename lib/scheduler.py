@@ -0,0 +1,177 @@
+import threading
+import pytest
+from lib.user_pool import UserPool
+
+# Общие предусловия тестов. Тест объявляет, какое состояние ему нужно и меняет ли он его:
+#
+#   @pytest.mark.state("logged_in_user")                         - только читает
+#   @pytest.mark.state("two_logged_in_users", mutates=True)      - меняет
+#   def test_x(self, state): ...
+#
+# Читающие тесты получают одну общую копию состояния на всю сессию, меняющие - свою
+# свежую копию, которая после теста не переиспользуется. Планировщик ставит читающие
+# тесты одного состояния подряд и считает размер пула по плану запуска.
+# Общая копия в пул не возвращается: упавший читающий тест мог оставить пользователя
+# в любом состоянии, и меняющий тест из другого модуля не должен его унаследовать.
+#
+# Порядок и общая копия действуют в пределах одного процесса. Под pytest-xdist все тесты
+# одного состояния получают метку xdist_group и при --dist loadgroup идут на один воркер;
+# режим по умолчанию для -n (load) tests/conftest.py заменяет на loadgroup, при других
+# режимах (loadscope, loadfile, ...) выводится предупреждение. Шарды lib.parallel - отдельные
+# процессы со своими UserPool, общие копии между ними не пересекаются.
+
+STATES = {
+    # имя состояния -> сколько залогиненных пользователей из UserPool оно занимает
+    "logged_in_user": 1,
+    "two_logged_in_users": 2,
+}
+
+
+def state_marker(item):
+    marker = item.get_closest_marker("state")
+    if marker is None:
+        return None, False
+    name = marker.args[0] if marker.args else marker.kwargs.get("name")
+    if name not in STATES:
+        raise Exception(f"Unknown state '{name}', expected one of {', '.join(STATES)}")
+    return name, bool(marker.kwargs.get("mutates", False))
+
+
+def acquire_state(name: str):
+    users = [UserPool.acquire() for _ in range(STATES[name])]
+    return users[0] if len(users) == 1 else tuple(users)
+
+
+def release_state(state, mutated: bool):
+    for user in state if isinstance(state, tuple) else (state,):
+        if mutated and not user.deleted:
+            user.mark_mutated()
+        UserPool.release(user)
+
+
+def order(items: list):
+    # Тесты без состояния - в исходном порядке, затем читающие тесты, сгруппированные
+    # по состоянию (группа встаёт на место первого теста), затем меняющие
+    stateless, mutating = [], []
+    readers = {}
+    for item in items:
+        name, mutates = state_marker(item)
+        if name is None:
+            stateless.append(item)
+        elif mutates:
+            mutating.append(item)
+        else:
+            readers.setdefault(name, []).append(item)
+    return stateless + [item for group in readers.values() for item in group] + mutating
+
+
+def check_xdist_mode(config):
+    # -> предупреждение или None; режим load (по умолчанию для -n) переключается на loadgroup
+    dist = getattr(config.option, "dist", "no")
+    if dist == "load":
+        config.option.dist = "loadgroup"
+        return None
+    if dist in ("no", "loadgroup"):
+        return None
+    return (
+        f"pytest-xdist --dist {dist} ignores xdist_group: tests of one scenario state may run on "
+        f"different workers, run with --dist loadgroup to keep their order (see lib/scheduler.py)"
+    )
+
+
+def users_needed(items: list):
+    # Сколько пользователей понадобится пулу при таком порядке: ни общие копии, ни копии
+    # меняющих тестов в пул не возвращаются; обратно приходят только пользователи pooled_user
+    needed = free = 0
+    opened = set()
+
+    def take(count):
+        nonlocal needed, free
+        reused = min(free, count)
+        free -= reused
+        needed += count - reused
+
+    for item in items:
+        name, mutates = state_marker(item)
+        if "pooled_user" in getattr(item, "fixturenames", ()):
+            take(1)
+            free += 1
+        if name is None:
+            continue
+        if mutates:
+            take(STATES[name])
+        elif name not in opened:
+            opened.add(name)
+            take(STATES[name])
+    return needed
+
+
+class ScenarioScheduler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shared = {}
+        self._readers_left = {}
+        self.planned_users = None
+
+    def get(self, item):
+        # Состояние для теста (фикстура state): общая копия для читающих, свежая для меняющих
+        name, mutates = state_marker(item)
+        if name is None:
+            raise Exception(f"Test {item.nodeid} uses the 'state' fixture without @pytest.mark.state(...)")
+        if mutates:
+            return acquire_state(name)
+        with self._lock:
+            if name not in self._shared:
+                self._shared[name] = acquire_state(name)
+            return self._shared[name]
+
+    def finish(self, item, state):
+        # Свежая копия меняющего теста в пул не возвращается; общая выводится из пула после последнего читателя
+        _, mutates = state_marker(item)
+        if mutates:
+            release_state(state, mutated=True)
+
+    def release_all(self):
+        with self._lock:
+            shared, self._shared = self._shared, {}
+        for state in shared.values():
+            release_state(state, mutated=True)
+
+    # Хуки pytest: плагин регистрируется в tests/conftest.py
+
+    def pytest_itemcollected(self, item):
+        # Читающие и меняющие тесты одного состояния - на одном воркере xdist
+        name, _ = state_marker(item)
+        if name is not None:
+            item.add_marker(pytest.mark.xdist_group(f"state-{name}"))
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, config, items):
+        # trylast - после отбора тестов шарда (lib/sharding.py)
+        items[:] = order(items)
+        self._readers_left = {}
+        for item in items:
+            name, mutates = state_marker(item)
+            if name is not None and not mutates:
+                self._readers_left[name] = self._readers_left.get(name, 0) + 1
+
+        self.planned_users = users_needed(items)
+        if self.planned_users:
+            # План известен заранее: пул заполняется один раз ровно на план и пополняется, только если опустел
+            UserPool.size = self.planned_users
+            UserPool.low_watermark = 0
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_teardown(self, item, nextitem):
+        yield
+        name, mutates = state_marker(item)
+        if name is None or mutates:
+            return
+        with self._lock:
+            self._readers_left[name] -= 1
+            state = self._shared.pop(name, None) if self._readers_left[name] == 0 else None
+        if state is not None:
+            release_state(state, mutated=True)
+
+    def pytest_sessionfinish(self, session):
+        self.release_all()
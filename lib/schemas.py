@@ -0,0 +1,191 @@
+import json
+import threading
+
+# Схемы ответов по эндпоинтам. Поддерживается небольшое подмножество JSON Schema:
+#   type                  - "object", "array", "string", "integer", "number", "boolean", "null" или список типов
+#   properties            - схемы полей объекта
+#   required              - обязательные поля
+#   forbidden             - поля, которых в ответе быть не должно
+#   additionalProperties  - False запрещает поля, не описанные в properties
+#   items                 - схема элементов массива
+#   const / enum          - допустимые значения
+#
+# Каждая схема один раз компилируется в функцию-валидатор, которая проходит
+# тело за один проход и возвращает список ошибок с путями вида $.items[3].email.
+# Валидаторы кэшируются по имени схемы из SCHEMAS, а схемы-словари - по их JSON:
+# одинаковые словари, созданные в разных тестах, компилируются один раз.
+
+USER_ID_TYPE = ["string", "integer"]
+
+SCHEMAS = {
+    "user_unauthorized": {
+        "type": "object",
+        "properties": {
+            "username": {"type": "string"},
+        },
+        "required": ["username"],
+        "forbidden": ["id", "email", "firstName", "lastName"],
+    },
+    "user_authorized": {
+        "type": "object",
+        "properties": {
+            "id": {"type": USER_ID_TYPE},
+            "username": {"type": "string"},
+            "email": {"type": "string"},
+            "firstName": {"type": "string"},
+            "lastName": {"type": "string"},
+        },
+        "required": ["id", "username", "email", "firstName", "lastName"],
+    },
+    "user_create": {
+        "type": "object",
+        "properties": {
+            "id": {"type": USER_ID_TYPE},
+        },
+        "required": ["id"],
+    },
+    "user_login": {
+        "type": "object",
+        "properties": {
+            "user_id": {"type": "integer"},
+        },
+        "required": ["user_id"],
+    },
+    "user_auth": {
+        "type": "object",
+        "properties": {
+            "user_id": {"type": "integer"},
+        },
+        "required": ["user_id"],
+    },
+}
+
+_TYPE_CHECKS = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+_compiled = {}
+_lock = threading.Lock()
+
+
+def _type_name(value):
+    for name in ("null", "boolean", "integer", "number", "string", "array", "object"):
+        if _TYPE_CHECKS[name](value):
+            return name
+    return type(value).__name__
+
+
+def _compile(schema: dict):
+    checks = []
+
+    expected_types = schema.get("type")
+    if expected_types is not None:
+        if isinstance(expected_types, str):
+            expected_types = [expected_types]
+        type_checks = [_TYPE_CHECKS[name] for name in expected_types]
+        expected_text = " or ".join(expected_types)
+
+        def check_type(value, path, errors):
+            for type_check in type_checks:
+                if type_check(value):
+                    return True
+            errors.append(f"{path}: expected {expected_text}, got {_type_name(value)}")
+            return False
+
+        checks.append(check_type)
+
+    if "const" in schema:
+        const = schema["const"]
+
+        def check_const(value, path, errors):
+            if value != const:
+                errors.append(f"{path}: expected {const!r}, got {value!r}")
+            return True
+
+        checks.append(check_const)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} is not one of {allowed!r}")
+            return True
+
+        checks.append(check_enum)
+
+    properties = {name: _compile(sub_schema) for name, sub_schema in schema.get("properties", {}).items()}
+    required = list(schema.get("required", []))
+    forbidden = list(schema.get("forbidden", []))
+    additional = schema.get("additionalProperties", True)
+
+    if properties or required or forbidden or additional is False:
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return True
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}: missing required key '{name}'")
+            for name in forbidden:
+                if name in value:
+                    errors.append(f"{path}.{name}: key must not be present")
+            for name, item in value.items():
+                validator = properties.get(name)
+                if validator is not None:
+                    validator(item, f"{path}.{name}", errors)
+                elif additional is False:
+                    errors.append(f"{path}.{name}: unexpected key")
+            return True
+
+        checks.append(check_object)
+
+    if "items" in schema:
+        item_validator = _compile(schema["items"])
+
+        def check_items(value, path, errors):
+            if not isinstance(value, list):
+                return True
+            for index, item in enumerate(value):
+                item_validator(item, f"{path}[{index}]", errors)
+            return True
+
+        checks.append(check_items)
+
+    def validate(value, path, errors):
+        for check in checks:
+            # Если не совпал тип, дальнейшие проверки узла не имеют смысла
+            if not check(value, path, errors):
+                return
+
+    return validate
+
+
+def get_validator(schema):
+    # schema - имя схемы из SCHEMAS или сама схема (dict)
+    if isinstance(schema, str):
+        if schema not in SCHEMAS:
+            raise Exception(f"Unknown response schema '{schema}'")
+        key, schema_dict = ("name", schema), SCHEMAS[schema]
+    else:
+        key, schema_dict = ("json", json.dumps(schema, sort_keys=True, default=repr)), schema
+
+    with _lock:
+        validator = _compiled.get(key)
+    if validator is not None:
+        return validator
+
+    validator = _compile(schema_dict)
+    with _lock:
+        return _compiled.setdefault(key, validator)
+
+
+def validate(value, schema):
+    errors = []
+    get_validator(schema)(value, "$", errors)
+    return errors
@@ -0,0 +1,108 @@
+import glob
+import json
+import os
+from lib.worker import worker_id
+
+# Разбиение тестов на шарды по сохранённой длительности (а не по количеству).
+# Длительности копятся в .test_durations.json только по --store-durations. Файл не хранится
+# в репозитории: его стоит снимать прогоном против того окружения, где будут делить тесты
+# (ENV=local меряет миллисекунды и для dev ничего не говорит), и раздавать машинам вместе с кодом.
+# Разбиение детерминированное: каждый процесс сам собирает все тесты и оставляет себе свою часть.
+
+DURATIONS_FILE = ".test_durations.json"
+DEFAULT_DURATION = 1.0
+
+
+def load_durations(file_name: str = DURATIONS_FILE):
+    if not os.path.exists(file_name):
+        return {}
+    with open(file_name, 'r', encoding='utf-8') as durations_file:
+        return json.load(durations_file)
+
+
+def save_durations(durations: dict, file_name: str = DURATIONS_FILE):
+    # Новые значения дописываются к уже сохранённым
+    merged = load_durations(file_name)
+    merged.update({node_id: round(duration, 4) for node_id, duration in durations.items()})
+    temporary_name = f"{file_name}.{os.getpid()}.tmp"
+    with open(temporary_name, 'w', encoding='utf-8') as durations_file:
+        json.dump(merged, durations_file, indent=1, sort_keys=True)
+    os.replace(temporary_name, file_name)
+
+
+def merge_worker_durations(durations_file: str = DURATIONS_FILE):
+    # Частичные файлы воркеров: w* - lib.parallel, gw* - pytest-xdist
+    merged = {}
+    partial_files = sorted(
+        glob.glob(f"{glob.escape(durations_file)}.w*") + glob.glob(f"{glob.escape(durations_file)}.gw*")
+    )
+    for partial_file in partial_files:
+        with open(partial_file, 'r', encoding='utf-8') as source:
+            merged.update(json.load(source))
+        os.remove(partial_file)
+    if merged:
+        save_durations(merged, durations_file)
+
+
+def split(node_ids: list, durations: dict, num_shards: int):
+    # Жадная балансировка (LPT): самые долгие тесты первыми, каждый - в наименее загруженный шард.
+    # Для тестов без истории берём среднюю известную длительность
+    known = [durations[node_id] for node_id in node_ids if node_id in durations]
+    default = sum(known) / len(known) if known else DEFAULT_DURATION
+
+    weighted = sorted(((durations.get(node_id, default), node_id) for node_id in node_ids), key=lambda item: (-item[0], item[1]))
+    shards = [[] for _ in range(num_shards)]
+    totals = [0.0] * num_shards
+    for duration, node_id in weighted:
+        index = min(range(num_shards), key=lambda shard: (totals[shard], shard))
+        shards[index].append(node_id)
+        totals[index] += duration
+    return shards, totals
+
+
+class ShardPlugin:
+    def __init__(self, shard_id: int, num_shards: int, durations_file: str, store_durations: bool):
+        if not 0 <= shard_id < num_shards:
+            raise Exception(f"Bad shard id {shard_id} for {num_shards} shards")
+        self.shard_id = shard_id
+        self.num_shards = num_shards
+        self.durations_file = durations_file
+        self.store_durations = store_durations
+        self.durations = {}
+        self.estimate = None
+
+    def select(self, items: list):
+        shards, totals = split([item.nodeid for item in items], load_durations(self.durations_file), self.num_shards)
+        selected = set(shards[self.shard_id])
+        self.estimate = totals[self.shard_id]
+        return [item for item in items if item.nodeid in selected], [item for item in items if item.nodeid not in selected]
+
+    # Хуки pytest: плагин регистрируется в tests/conftest.py
+
+    def pytest_collection_modifyitems(self, config, items):
+        if self.num_shards == 1:
+            return
+        selected, deselected = self.select(items)
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+    def pytest_report_collectionfinish(self, config, start_path, items):
+        if self.num_shards == 1:
+            return None
+        return f"shard {self.shard_id + 1}/{self.num_shards}: {len(items)} tests, estimated {self.estimate:.1f} s"
+
+    def pytest_runtest_logreport(self, report):
+        self.durations[report.nodeid] = self.durations.get(report.nodeid, 0.0) + report.duration
+
+    def pytest_sessionfinish(self, session):
+        if not self.store_durations or not self.durations:
+            return
+        worker = worker_id()
+        if worker == "main":
+            save_durations(self.durations, self.durations_file)
+            # Под pytest-xdist основной процесс завершается последним и забирает файлы воркеров gw*
+            merge_worker_durations(self.durations_file)
+        else:
+            # Воркеры пишут свои файлы, основной процесс (lib.parallel или pytest-xdist) сливает их в общий
+            save_durations(self.durations, f"{self.durations_file}.{worker}")
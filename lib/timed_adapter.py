@@ -0,0 +1,69 @@
+import socket
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from lib import timing
+
+# Соединения urllib3, которые записывают фазы dns, connect и tls в lib.timing.
+# Модуль импортируется при создании первой сессии: requests и urllib3 не нужны,
+# пока не отправлен первый запрос.
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        timings = timing.current()
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        except OSError:
+            # Ошибку разрешения имени urllib3 оформит сам
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        timings["dns"] += resolved - started
+
+        # Подключаемся к уже разрешённым адресам по очереди, как и create_connection
+        original_host = self._dns_host
+        last_error = None
+        try:
+            for address in dict.fromkeys(info[4][0] for info in addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except Exception as error:
+                    last_error = error
+            raise last_error
+        finally:
+            self._dns_host = original_host
+            timings["connect"] += time.perf_counter() - resolved
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        timings = timing.current()
+        setup_before = timings["dns"] + timings["connect"]
+        started = time.perf_counter()
+        super().connect()
+        setup = timings["dns"] + timings["connect"] - setup_before
+        timings["tls"] += max(time.perf_counter() - started - setup, 0.0)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
@@ -0,0 +1,42 @@
+import threading
+
+# Разбивка времени запроса на фазы: dns, connect, tls, ttfb (ожидание первого байта
+# ответа сервером) и transfer (чтение тела). Фазы установления соединения
+# снимаются в соединениях urllib3 (lib/timed_adapter.py), поэтому у переиспользованного
+# соединения они равны 0.
+
+PHASES = ("dns", "connect", "tls", "ttfb", "transfer", "total")
+
+_local = threading.local()
+
+
+def start():
+    _local.timings = {"dns": 0.0, "connect": 0.0, "tls": 0.0}
+    return _local.timings
+
+
+def current():
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        timings = start()
+    return timings
+
+
+def snapshot():
+    return dict(current())
+
+
+def adopt(timings: dict):
+    # Фазы, снятые в другом потоке (например, в дублирующем запросе), становятся фазами этого потока
+    _local.timings = dict(timings)
+
+
+def finish(response, total: float):
+    timings = dict(current())
+    # response.elapsed - от отправки запроса до разбора заголовков ответа, включая установку соединения
+    elapsed = response.elapsed.total_seconds() if response is not None else total
+    setup = timings["dns"] + timings["connect"] + timings["tls"]
+    timings["ttfb"] = max(elapsed - setup, 0.0)
+    timings["transfer"] = max(total - elapsed, 0.0)
+    timings["total"] = total
+    return timings
@@ -0,0 +1,210 @@
+import os
+import threading
+import time
+from collections import deque
+from lib.cassette import cassette_scope
+from lib.data_generator import DataGenerator
+from lib.my_requests import MyRequests
+from lib.response_json import get_response_json
+
+
+class PooledUser:
+    def __init__(self, user_id, email: str, password: str, auth_sid: str, token: str, registration_data: dict):
+        self.id = user_id
+        self.email = email
+        self.password = password
+        self.auth_sid = auth_sid
+        self.token = token
+        self.registration_data = registration_data
+        self.mutated = False
+        self.deleted = False
+
+    @property
+    def headers(self):
+        return {"x-csrf-token": self.token}
+
+    @property
+    def cookies(self):
+        return {"auth_sid": self.auth_sid}
+
+    def mark_mutated(self):
+        # Пользователь изменён тестом - обратно в пул он не вернётся
+        self.mutated = True
+
+    def mark_deleted(self):
+        self.deleted = True
+
+
+class UserPool:
+    # Сколько пользователей зарегистрировать заранее и при каком остатке пополнять пул:
+    # export USER_POOL_SIZE=20 USER_POOL_LOW_WATERMARK=5
+    size = int(os.environ.get('USER_POOL_SIZE', 10))
+    low_watermark = int(os.environ.get('USER_POOL_LOW_WATERMARK', 3))
+    acquire_timeout = float(os.environ.get('USER_POOL_TIMEOUT', 30))
+    # После стольких пополнений подряд без единого пользователя acquire() сразу падает
+    # с последней ошибкой регистрации или логина: export USER_POOL_MAX_FAILURES=3
+    max_failures = int(os.environ.get('USER_POOL_MAX_FAILURES', 3))
+
+    _available = deque()
+    _condition = threading.Condition()
+    _refill_thread = None
+    _started = False
+    _failures = 0
+    _last_error = None
+
+    mutated_users = []
+    deleted_users = []
+
+    def __init_subclass__(cls, **kwargs):
+        # У подкласса (например, изолированного пула в тестах) своё состояние и свой учёт
+        # изменённых и удалённых пользователей: иначе они попадали бы в общий пул сессии
+        super().__init_subclass__(**kwargs)
+        cls._available = deque()
+        cls._condition = threading.Condition()
+        cls._refill_thread = None
+        cls._started = False
+        cls._failures = 0
+        cls._last_error = None
+        cls.mutated_users = []
+        cls.deleted_users = []
+
+    @classmethod
+    def start(cls):
+        with cls._condition:
+            if cls._started:
+                return
+            cls._started = True
+        cls._fill(cls.size)
+
+    @classmethod
+    def acquire(cls):
+        cls.start()
+        deadline = time.monotonic() + cls.acquire_timeout
+        with cls._condition:
+            if len(cls._available) <= cls.low_watermark:
+                cls._start_refill()
+            while not cls._available:
+                cls._check_failures()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception(
+                        f"No users available in the pool after {cls.acquire_timeout} seconds. "
+                        f"Last refill error: {cls._last_error}"
+                    )
+                # Пополнение закончилось ничем - запускаем следующее
+                cls._start_refill()
+                cls._condition.wait(min(remaining, 0.5))
+            return cls._available.popleft()
+
+    @classmethod
+    def release(cls, user: PooledUser):
+        with cls._condition:
+            if user.deleted:
+                cls.deleted_users.append(user)
+            elif user.mutated:
+                cls.mutated_users.append(user)
+            else:
+                cls._available.append(user)
+                cls._condition.notify()
+
+    @classmethod
+    def stop(cls):
+        thread = cls._refill_thread
+        if thread is not None:
+            thread.join()
+        with cls._condition:
+            cls._available.clear()
+            cls._started = False
+            cls._failures = 0
+            cls._last_error = None
+
+    @classmethod
+    def _check_failures(cls):
+        # Вызывается под cls._condition
+        if cls.max_failures and cls._failures >= cls.max_failures:
+            raise AssertionError(
+                f"User pool could not register and log in users {cls._failures} times in a row. "
+                f"Last error: {cls._last_error}"
+            )
+
+    @classmethod
+    def _start_refill(cls):
+        # Вызывается под cls._condition
+        if cls._refill_thread is not None and cls._refill_thread.is_alive():
+            return
+
+        def refill():
+            with cls._condition:
+                missing = cls.size - len(cls._available)
+            if missing > 0:
+                cls._fill(missing)
+
+        cls._refill_thread = threading.Thread(target=refill, name="UserPool-refill", daemon=True)
+        cls._refill_thread.start()
+
+    @classmethod
+    def _fill(cls, count: int):
+        scope = cassette_scope.set("UserPool")
+        try:
+            return cls._register_and_login(count)
+        except Exception as error:
+            # Пополнение идёт и в фоновом потоке: ошибка запоминается для acquire(), а не теряется
+            with cls._condition:
+                cls._last_error = f"{type(error).__name__}: {error}"
+                cls._failures += 1
+                cls._condition.notify_all()
+            return 0
+        finally:
+            cassette_scope.reset(scope)
+
+    @classmethod
+    def _register_and_login(cls, count: int):
+        registration_data = DataGenerator.registration_batch(count)
+
+        results = MyRequests.batch([
+            {"method": "POST", "url": "/user", "data": data} for data in registration_data
+        ])
+        registered = []
+        errors = []
+        for data, result in zip(registration_data, results):
+            if result.ok and result.response.status_code == 200:
+                registered.append((data, get_response_json(result.response)["id"]))
+            else:
+                errors.append(cls._describe_failure("POST /user", result))
+
+        results = MyRequests.batch([
+            {"method": "POST", "url": "/user/login", "data": {"email": data["email"], "password": data["password"]}}
+            for data, _ in registered
+        ])
+        users = []
+        for (data, user_id), result in zip(registered, results):
+            if not result.ok:
+                errors.append(cls._describe_failure("POST /user/login", result))
+                continue
+            response = result.response
+            if "auth_sid" not in response.cookies or "x-csrf-token" not in response.headers:
+                errors.append(cls._describe_failure("POST /user/login", result))
+                continue
+            users.append(PooledUser(
+                user_id,
+                data["email"],
+                data["password"],
+                response.cookies["auth_sid"],
+                response.headers["x-csrf-token"],
+                data
+            ))
+
+        with cls._condition:
+            cls._available.extend(users)
+            if errors:
+                cls._last_error = errors[-1]
+            cls._failures = 0 if users else cls._failures + 1
+            cls._condition.notify_all()
+        return len(users)
+
+    @staticmethod
+    def _describe_failure(request: str, result):
+        if not result.ok:
+            return f"{request}: {type(result.error).__name__}: {result.error}"
+        response = result.response
+        return f"{request}: status {response.status_code}, response '{response.text[:200]}'"
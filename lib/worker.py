@@ -0,0 +1,17 @@
+import os
+
+
+def worker_id():
+    # python -m lib.parallel выставляет LEARNQA_WORKER (w0, w1, ...) каждому процессу,
+    # pytest-xdist - PYTEST_XDIST_WORKER (gw0, gw1, ...)
+    return os.environ.get('LEARNQA_WORKER') or os.environ.get('PYTEST_XDIST_WORKER') or 'main'
+
+
+def worker_tag():
+    # Уникальная метка процесса: воркер + pid, чтобы процессы не писали в одни и те же файлы
+    return f"{worker_id()}-{os.getpid()}"
+
+
+def host_name():
+    import socket
+    return socket.gethostname()
@@ -0,0 +1,170 @@
+import json
+import os
+import allure
+import pytest
+from environment import ENV_OBJECT, Environment
+from lib.auth_cache import AuthCache
+from lib.logger import Logger
+from lib.metrics import RequestMetrics
+from lib.my_requests import MyRequests
+from lib.reporting import OFF, SUMMARY, Reporting
+from lib.response_cache import ResponseCache
+from lib.scheduler import ScenarioScheduler, check_xdist_mode
+from lib.sharding import DURATIONS_FILE, ShardPlugin
+from lib.user_pool import UserPool
+from lib.worker import worker_tag
+
+
+@pytest.fixture(scope="session", autouse=True)
+def http_sessions():
+    yield
+    MyRequests.close_sessions()
+    Logger.flush()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def request_metrics():
+    # Гистограммы времени запросов по фазам; в конце сессии - JSON в каталоге логов и вложения allure
+    MyRequests.add_listener(RequestMetrics.on_request)
+    yield RequestMetrics
+    MyRequests.remove_listener(RequestMetrics.on_request)
+
+    data = RequestMetrics.to_dict()
+    if data:
+        RequestMetrics.write_json(os.path.join(Logger.log_dir, f"metrics_{worker_tag()}.json"))
+        if Reporting.mode != OFF:
+            allure.attach(json.dumps(data, indent=2), "Request timings", allure.attachment_type.JSON)
+            allure.attach(RequestMetrics.summary_table(), "Request timings table", allure.attachment_type.TEXT)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def request_report():
+    # REPORTING_MODE=summary: запросы теста собираются в одно вложение (см. lib/reporting.py).
+    # В остальных режимах подписчик не регистрируется
+    if Reporting.mode != SUMMARY:
+        yield Reporting
+        return
+    MyRequests.add_listener(Reporting.on_request)
+    yield Reporting
+    MyRequests.remove_listener(Reporting.on_request)
+
+
+@pytest.fixture(autouse=True)
+def test_report(request_report):
+    token = request_report.start_test()
+    yield
+    request_report.finish_test(token)
+
+
+@pytest.fixture
+def local_env(monkeypatch):
+    # Тесты механики MyRequests идут против LocalServer (lib/local_server.py) при любом ENV;
+    # после теста пул адресов прежнего окружения строится заново
+    monkeypatch.delenv("BASE_URLS", raising=False)
+    monkeypatch.setattr(ENV_OBJECT, "env", Environment.LOCAL)
+    yield ENV_OBJECT
+
+
+@pytest.fixture(scope="session", autouse=True)
+def auth_cache():
+    yield AuthCache
+    AuthCache.clear()
+
+
+@pytest.fixture(autouse=True)
+def login_mode(request, auth_cache):
+    # Тесты с маркером fresh_login не берут логины из кэша: BaseCase.login логинится заново
+    if request.node.get_closest_marker("fresh_login") is None:
+        yield
+        return
+    token = auth_cache.fresh_logins()
+    yield
+    auth_cache.reset_fresh_logins(token)
+
+
+@pytest.fixture(scope="session")
+def user_pool():
+    # Пул заранее зарегистрированных и залогиненных пользователей
+    UserPool.start()
+    yield UserPool
+    UserPool.stop()
+
+
+@pytest.fixture
+def pooled_user(user_pool):
+    # Если тест меняет или удаляет пользователя, он вызывает
+    # pooled_user.mark_mutated() / pooled_user.mark_deleted()
+    user = user_pool.acquire()
+    yield user
+    user_pool.release(user)
+
+
+@pytest.fixture
+def state(request, user_pool):
+    # Состояние из маркера @pytest.mark.state(name, mutates=False), см. lib/scheduler.py
+    scheduler = request.config.pluginmanager.get_plugin("learnqa-scheduler")
+    value = scheduler.get(request.node)
+    yield value
+    scheduler.finish(request.node, value)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("sharding", "duration-balanced sharding (see lib/sharding.py and lib/parallel.py)")
+    group.addoption("--shard-id", type=int, default=0, help="index of this shard, from 0")
+    group.addoption("--num-shards", type=int, default=1, help="total number of shards")
+    group.addoption("--durations-file", default=DURATIONS_FILE, help="stored per-test durations")
+    group.addoption("--store-durations", action="store_true", help="save durations of this run")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "fresh_login: do not use the session login cache in this test")
+    config.addinivalue_line("markers", "state(name, mutates=False): shared precondition of the test, see lib/scheduler.py")
+    # Регистрирует и сам pytest-xdist; без него метка ставится планировщиком и ни на что не влияет
+    config.addinivalue_line("markers", "xdist_group(name): run tests of the group on one xdist worker")
+
+    durations_file = config.getoption("durations_file")
+    if not os.path.isabs(durations_file):
+        durations_file = str(config.rootpath / durations_file)
+    config.pluginmanager.register(ShardPlugin(
+        config.getoption("shard_id"),
+        config.getoption("num_shards"),
+        durations_file,
+        config.getoption("store_durations")
+    ), "learnqa-sharding")
+    config.pluginmanager.register(ScenarioScheduler(), "learnqa-scheduler")
+    warning = check_xdist_mode(config)
+    if warning is not None:
+        config.issue_config_time_warning(pytest.PytestConfigWarning(warning), stacklevel=2)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    yield
+    if call.when == "call":
+        # Сводка запросов - в тело теста, а не в teardown фикстуры test_report
+        Reporting.attach_summary()
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    scheduler = config.pluginmanager.get_plugin("learnqa-scheduler")
+    if scheduler is not None and scheduler.planned_users:
+        terminalreporter.write_line(f"Scenario states: {scheduler.planned_users} pooled users planned for this run")
+
+    stats = MyRequests.connection_stats()
+    if stats["requests"]:
+        terminalreporter.write_line(
+            f"HTTP connections: opened {stats['connections_opened']}, "
+            f"reused {stats['connections_reused']}, requests {stats['requests']}"
+        )
+
+    if ResponseCache.enabled:
+        cache = ResponseCache.stats()
+        terminalreporter.write_line(
+            f"GET cache: hits {cache['hits']}, revalidated {cache['revalidated']}, "
+            f"misses {cache['misses']}, invalidated {cache['invalidated']}"
+        )
+
+    table = RequestMetrics.summary_table()
+    if table:
+        terminalreporter.write_sep("-", "request timings")
+        terminalreporter.write_line(table)
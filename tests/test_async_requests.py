@@ -0,0 +1,42 @@
+import threading
+import time
+import allure
+from lib.async_requests import AsyncMyRequests
+from lib.my_requests import MyRequests
+
+# Для запуска теста из командной строки:
+# python -m pytest -s tests/test_async_requests.py
+
+
+@allure.epic("Async requests")
+class TestAsyncMyRequests:
+    @allure.description("This test checks that the semaphore bounds concurrent requests and answers keep their order")
+    def test_concurrency_is_bounded(self, monkeypatch):
+        lock = threading.Lock()
+        in_flight = []
+        peak = []
+
+        def slow_get(url, data=None, headers=None, cookies=None, fresh=False):
+            with lock:
+                in_flight.append(url)
+                peak.append(len(in_flight))
+            time.sleep(0.05)
+            with lock:
+                in_flight.remove(url)
+            return url
+
+        monkeypatch.setattr(MyRequests, "get", slow_get)
+        concurrency = AsyncMyRequests.concurrency
+        AsyncMyRequests.configure(2)
+        try:
+            urls = [f"/user/{index}" for index in range(6)]
+            started = time.monotonic()
+            responses = AsyncMyRequests.run(*[AsyncMyRequests.get(url) for url in urls])
+            elapsed = time.monotonic() - started
+        finally:
+            AsyncMyRequests.configure(concurrency)
+
+        assert responses == urls
+        assert max(peak) == 2, f"Up to {max(peak)} requests ran at once with concurrency 2"
+        # 6 запросов по 0.05 с по два одновременно - не меньше трёх волн, но не по очереди
+        assert 0.14 <= elapsed < 0.3, f"6 requests took {elapsed:.2f} s"
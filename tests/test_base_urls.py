@@ -0,0 +1,108 @@
+import time
+import allure
+from environment import ENV_OBJECT
+from lib.assertions import Assertions
+from lib.base_urls import ROUND_ROBIN, EndpointPool
+from lib.local_server import LocalServer
+from lib.my_requests import MyRequests
+from lib.resilience import Policy, Resilience
+
+# Для запуска теста из командной строки:
+# python -m pytest -s tests/test_base_urls.py
+
+# Порт 1 никто не слушает: соединение сразу отклоняется
+DEAD_URL = "http://127.0.0.1:1"
+
+
+def wait_for(condition, timeout: float = 3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def endpoint_stats(pool: EndpointPool):
+    return {stats["url"]: stats for stats in pool.stats()}
+
+
+@allure.epic("Base URLs")
+class TestEndpointPool:
+    @allure.description("This test checks that a request to a dead base URL is retried on a live one")
+    def test_failover_to_live_url(self, local_env, monkeypatch):
+        live_url = LocalServer.base_url()
+        monkeypatch.setenv("BASE_URLS", f"{DEAD_URL},{live_url}")
+        monkeypatch.setattr(EndpointPool, "strategy", ROUND_ROBIN)
+        monkeypatch.setattr(EndpointPool, "probe_interval", 0)
+        # Пул строится заново из BASE_URLS, после теста возвращается прежний
+        monkeypatch.setattr(ENV_OBJECT, "_pool", None)
+        # Переключение на другой адрес происходит при повторе, а повторы по умолчанию выключены
+        monkeypatch.setattr(Resilience, "default_policy", Policy(retries=2, backoff=0))
+
+        try:
+            # Круговой выбор начинает с первого адреса - первый запрос уходит на мёртвый
+            for _ in range(4):
+                response = MyRequests.get("/user/2")
+                Assertions.assert_code_status(response, 200)
+            pool = ENV_OBJECT.get_pool()
+            stats = endpoint_stats(pool)
+            assert not stats[DEAD_URL]["up"], "Unreachable base URL stayed in rotation"
+            assert stats[live_url]["up"]
+        finally:
+            ENV_OBJECT.get_pool().stop()
+
+    @allure.description("This test checks that a request fails over to a live URL with the default retry settings")
+    def test_failover_without_retries(self, local_env, monkeypatch):
+        live_url = LocalServer.base_url()
+        monkeypatch.setenv("BASE_URLS", f"{DEAD_URL},{live_url}")
+        monkeypatch.setattr(EndpointPool, "strategy", ROUND_ROBIN)
+        monkeypatch.setattr(EndpointPool, "probe_interval", 0)
+        monkeypatch.setattr(ENV_OBJECT, "_pool", None)
+        monkeypatch.setattr(Resilience, "default_policy", Policy())
+        assert Resilience.default_policy.retries == 0
+
+        # Каждый запрос - в новом пуле, чтобы круговой выбор снова начал с мёртвого адреса.
+        # POST переключается тоже: соединение отклонено, сервер запроса не видел
+        sends = [
+            lambda: MyRequests.get("/user/2"),
+            lambda: MyRequests.post("/user/login", data={"email": "vinkotov@example.com", "password": "1234"}),
+        ]
+        for send in sends:
+            ENV_OBJECT.get_pool().stop()
+            ENV_OBJECT._pool = None
+            try:
+                response = send()
+                Assertions.assert_code_status(response, 200)
+                assert response.retries == 1, "Request was not sent to the dead URL first"
+                assert not endpoint_stats(ENV_OBJECT.get_pool())[DEAD_URL]["up"]
+            finally:
+                ENV_OBJECT.get_pool().stop()
+
+    @allure.description("This test checks that health probes take a dead URL out and bring a live one back")
+    def test_probes_update_health(self):
+        live_url = LocalServer.base_url()
+        pool = EndpointPool([DEAD_URL, live_url])
+        pool.probe_interval = 0.05
+        pool.cooldown = 60
+        try:
+            # Живой адрес выведен сбоем запроса и без проверки вернулся бы только через cooldown
+            pool.report(live_url, False, reachable=False)
+            assert not endpoint_stats(pool)[live_url]["up"]
+            assert pool.pick() == DEAD_URL
+
+            assert wait_for(lambda: endpoint_stats(pool)[live_url]["up"]), "Successful probe did not bring the URL back"
+            assert wait_for(lambda: not endpoint_stats(pool)[DEAD_URL]["up"]), "Failed probe did not take the URL out"
+            assert endpoint_stats(pool)[live_url]["latency"] is not None
+            assert {pool.pick() for _ in range(20)} == {live_url}
+        finally:
+            pool.stop()
+
+    @allure.description("This test checks that with every URL down the one returning first is picked")
+    def test_all_down_picks_earliest_return(self):
+        live_url = LocalServer.base_url()
+        pool = EndpointPool([DEAD_URL, live_url])
+        pool.probe_interval = 0
+        pool.report(DEAD_URL, False, reachable=False)
+        pool.report(live_url, False, reachable=False)
+        assert pool.pick() == DEAD_URL
@@ -0,0 +1,70 @@
+import pytest
+import allure
+from lib.assertions import Assertions
+from lib.base_case import BaseCase
+from lib.cassette import RECORD, REPLAY, CassetteConfig
+from lib.my_requests import MyRequests
+
+# Для запуска теста из командной строки:
+# python -m pytest -s tests/test_cassette.py
+
+
+@pytest.fixture
+def cassette_dir(local_env, tmp_path, monkeypatch):
+    # Режим и каталог кассеты восстанавливаются после теста
+    monkeypatch.setattr(CassetteConfig, "mode", CassetteConfig.mode)
+    monkeypatch.setattr(CassetteConfig, "directory", CassetteConfig.directory)
+    monkeypatch.setattr(CassetteConfig, "_cassette", None)
+    return str(tmp_path)
+
+
+@allure.epic("Cassette")
+class TestCassette(BaseCase):
+    def register_and_get(self):
+        data = self.prepare_registration_data()
+        response = MyRequests.post("/user", data=data)
+        Assertions.assert_code_status(response, 200)
+        user_id = self.get_json_value(response, "id")
+
+        response = MyRequests.post("/user/login", data={"email": data["email"], "password": data["password"]})
+        Assertions.assert_code_status(response, 200)
+        headers = {"x-csrf-token": self.get_header(response, "x-csrf-token")}
+        cookies = {"auth_sid": self.get_cookie(response, "auth_sid")}
+
+        response = MyRequests.get(f"/user/{user_id}", headers=headers, cookies=cookies)
+        Assertions.assert_code_status(response, 200)
+        return data, user_id, response
+
+    @allure.description("This test records a scenario and replays it without the network")
+    def test_record_replay_round_trip(self, cassette_dir, monkeypatch):
+        CassetteConfig.configure(RECORD, cassette_dir)
+        _, recorded_id, recorded = self.register_and_get()
+
+        def no_network(*args, **kwargs):
+            raise AssertionError("Replay sent a request to the API")
+
+        monkeypatch.setattr(MyRequests, "_perform_once", no_network)
+        CassetteConfig.configure(REPLAY, cassette_dir)
+        data, replayed_id, replayed = self.register_and_get()
+
+        assert replayed_id == recorded_id, "Replay returned another user id than the recorded one"
+        assert replayed.json()["firstName"] == recorded.json()["firstName"]
+        # Сгенерированный email записи подменён на email текущего запуска
+        Assertions.assert_json_value_by_name(replayed, "email", data["email"], "Replay returned the recorded email")
+
+    @allure.description("This test checks that requests differing only in numeric values replay their own answers")
+    def test_numeric_values_are_part_of_key(self, cassette_dir, monkeypatch):
+        def login(password):
+            return MyRequests.post("/user/login", data={"email": "vinkotov@example.com", "password": password})
+
+        CassetteConfig.configure(RECORD, cassette_dir)
+        recorded = [login("1234").status_code, login("123").status_code]
+        assert recorded == [200, 400]
+
+        def no_network(*args, **kwargs):
+            raise AssertionError("Replay sent a request to the API")
+
+        monkeypatch.setattr(MyRequests, "_perform_once", no_network)
+        CassetteConfig.configure(REPLAY, cassette_dir)
+        # Обратный порядок: с ключом без пароля ответы пришли бы в порядке записи
+        assert [login("123").status_code, login("1234").status_code] == [400, 200]
@@ -0,0 +1,95 @@
+import json
+import os
+import subprocess
+import sys
+import allure
+
+# Для запуска теста из командной строки:
+# python -m pytest -s tests/test_import_time.py
+#
+# Бюджет времени импорта lib (миллисекунды) можно переопределить: export IMPORT_TIME_BUDGET_MS=150
+
+IMPORT_TIME_BUDGET_MS = float(os.environ.get('IMPORT_TIME_BUDGET_MS', 100))
+
+# Модули, которые сбор тестов и воркеры нагрузки используют при старте
+LIB_MODULES = [
+    "lib.my_requests",
+    "lib.assertions",
+    "lib.base_case",
+    "lib.auth_cache",
+    "lib.user_pool",
+    "lib.data_generator",
+    "lib.metrics",
+    "lib.schemas",
+]
+
+# Тяжёлые зависимости загружаются только при первом запросе
+DEFERRED_PACKAGES = ["requests", "urllib3", "allure", "allure_commons", "http.cookiejar", "concurrent.futures"]
+
+# Сбор тестов: модули tests/ импортируются после pytest и allure (их загружает сам pytest
+# с плагином allure), поэтому бюджет и список отложенных пакетов - только для нашего кода:
+#   export COLLECT_IMPORT_BUDGET_MS=150
+COLLECT_IMPORT_BUDGET_MS = float(os.environ.get('COLLECT_IMPORT_BUDGET_MS', 150))
+COLLECT_DEFERRED_PACKAGES = ["requests", "urllib3", "http.cookiejar", "asyncio"]
+
+_MEASURE = """
+import json, sys, time
+started = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+
+_MEASURE_COLLECT = """
+import glob, json, os, sys, time
+import allure, pytest
+modules = sorted("tests." + os.path.basename(name)[:-3] for name in glob.glob(os.path.join("tests", "test_*.py")))
+started = time.perf_counter()
+for name in modules:
+    __import__(name)
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+
+def run_measure(code: str):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def measure_import():
+    return run_measure(_MEASURE.format(modules=LIB_MODULES, deferred=DEFERRED_PACKAGES))
+
+
+def measure_collect_import():
+    return run_measure(_MEASURE_COLLECT.format(deferred=COLLECT_DEFERRED_PACKAGES))
+
+
+@allure.epic("Framework startup")
+class TestImportTime:
+    @allure.description("This test checks that importing lib does not load heavy dependencies")
+    def test_heavy_imports_are_deferred(self):
+        result = measure_import()
+        assert not result["loaded"], f"Importing lib loads {', '.join(result['loaded'])} at startup"
+
+    @allure.description("This test checks that importing lib fits into the startup budget")
+    def test_import_time_budget(self):
+        # Лучший из нескольких запусков: разовые задержки машины не должны валить тест
+        best = min(measure_import()["ms"] for _ in range(3))
+        allure.attach(f"{best:.1f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)", "Import time", allure.attachment_type.TEXT)
+        assert best <= IMPORT_TIME_BUDGET_MS, f"Importing lib takes {best:.1f} ms, budget is {IMPORT_TIME_BUDGET_MS:.0f} ms"
+
+    @allure.description("This test checks that importing the test modules does not load heavy dependencies")
+    def test_collection_defers_heavy_imports(self):
+        result = measure_collect_import()
+        assert not result["loaded"], f"Importing test modules loads {', '.join(result['loaded'])} at collection"
+
+    @allure.description("This test checks that importing the test modules fits into the collection budget")
+    def test_collection_import_budget(self):
+        best = min(measure_collect_import()["ms"] for _ in range(3))
+        allure.attach(f"{best:.1f} ms (budget {COLLECT_IMPORT_BUDGET_MS:.0f} ms)", "Test modules import time", allure.attachment_type.TEXT)
+        assert best <= COLLECT_IMPORT_BUDGET_MS, \
+            f"Importing test modules takes {best:.1f} ms, budget is {COLLECT_IMPORT_BUDGET_MS:.0f} ms"
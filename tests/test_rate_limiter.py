@@ -0,0 +1,109 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+import pytest
+import allure
+from lib.rate_limiter import _STATE, RateLimiter
+
+# Для запуска теста из командной строки:
+# python -m pytest -s tests/test_rate_limiter.py
+
+ENV = "rate-limiter-test"
+
+# Процесс ждёт общего старта и печатает время получения каждого жетона
+_WORKER = """
+import json, sys, time
+from lib.rate_limiter import _STATE, RateLimiter
+RateLimiter.configure({env!r}, "*", {rate!r})
+time.sleep(max({start!r} - time.time(), 0))
+taken = []
+for _ in range({count!r}):
+    RateLimiter.acquire({env!r}, "GET", "/user/2")
+    taken.append(time.time())
+print(json.dumps(taken))
+"""
+
+
+@pytest.fixture
+def limiter(tmp_path, monkeypatch):
+    # Отдельный каталог, запас в один жетон; лимиты и вёдра восстанавливаются после теста
+    # (переменные окружения - для процессов, которые запускает тест)
+    monkeypatch.setattr(RateLimiter, "directory", str(tmp_path))
+    monkeypatch.setattr(RateLimiter, "limits", {})
+    monkeypatch.setattr(RateLimiter, "_buckets", {})
+    monkeypatch.setattr(RateLimiter, "burst", 0.1)
+    # Восстановление со временем - только там, где его проверяют
+    monkeypatch.setattr(RateLimiter, "recovery", 3600)
+    monkeypatch.setenv("MYREQUESTS_RATE_DIR", str(tmp_path))
+    monkeypatch.setenv("MYREQUESTS_RATE_BURST", "0.1")
+    return RateLimiter
+
+
+def throttled_response():
+    return SimpleNamespace(status_code=429, headers={})
+
+
+@allure.epic("Rate limiter")
+class TestRateLimiter:
+    @allure.description("This test checks that two processes share one limit")
+    def test_processes_share_limit(self, limiter):
+        rate, count = 10, 5
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = _WORKER.format(env=ENV, rate=rate, start=time.time() + 1.0, count=count)
+        processes = [
+            subprocess.Popen([sys.executable, "-c", code], cwd=root, stdout=subprocess.PIPE, text=True)
+            for _ in range(2)
+        ]
+        taken = []
+        for process in processes:
+            output, _ = process.communicate(timeout=30)
+            assert process.returncode == 0
+            taken.extend(json.loads(output))
+        # Один жетон в запасе, остальные 9 - по одному в 0.1 с на оба процесса;
+        # с раздельными вёдрами каждый процесс уложился бы в 0.4 с
+        span = max(taken) - min(taken)
+        assert span >= 0.75, f"{len(taken)} requests of two processes took {span:.2f} s at {rate} requests per second"
+
+    @allure.description("This test checks that 429 halves the rate once per burst of throttled responses")
+    def test_throttled_halves_rate(self, limiter):
+        limiter.configure(ENV, "*", 8)
+        bucket = limiter._get_buckets(ENV, "GET", "/user/2")[0]
+        assert bucket.current_rate() == 8
+
+        limiter.observe(ENV, "GET", "/user/2", throttled_response())
+        assert bucket.current_rate() == pytest.approx(4, abs=0.01)
+        limiter.observe(ENV, "GET", "/user/2", throttled_response())
+        assert bucket.current_rate() == pytest.approx(4, abs=0.01), "Simultaneous 429 responses halved the rate twice"
+
+        limiter.observe(ENV, "GET", "/user/2", SimpleNamespace(status_code=200, headers={}))
+        assert bucket.current_rate() > 4.1
+
+    @allure.description("This test checks that the rate recovers over time after 429")
+    def test_rate_recovers_over_time(self, limiter, monkeypatch):
+        monkeypatch.setattr(RateLimiter, "recovery", 0.4)
+        limiter.configure(ENV, "*", 8)
+        bucket = limiter._get_buckets(ENV, "GET", "/user/2")[0]
+        limiter.observe(ENV, "GET", "/user/2", throttled_response())
+        assert bucket.current_rate() < 8
+
+        # 4 из 8 возвращаются за половину recovery
+        time.sleep(0.25)
+        assert bucket.current_rate() == 8
+
+    @allure.description("This test checks that the throttled rate of a previous run has worn off")
+    def test_stale_state_is_not_inherited(self, limiter):
+        limiter.configure(ENV, "*", 8)
+        bucket = limiter._get_buckets(ENV, "GET", "/user/2")[0]
+        # Прошлый прогон два часа назад упёрся в 429 и оставил минимальную частоту
+        long_ago = time.time() - 7200
+        bucket._update(lambda state, now: state.update(rate=limiter.min_rate, decreased_at=long_ago))
+        with open(bucket.file_name, 'r+b') as file:
+            tokens, _, rate, blocked_until, decreased_at = _STATE.unpack(file.read(_STATE.size))
+            file.seek(0)
+            file.write(_STATE.pack(tokens, long_ago, rate, blocked_until, decreased_at))
+
+        limiter.configure(ENV, "*", 8)
+        assert limiter._get_buckets(ENV, "GET", "/user/2")[0].current_rate() == 8
@@ -0,0 +1,50 @@
+import time
+import pytest
+import allure
+from lib.resilience import CircuitBreaker, CircuitOpenError, Policy
+
+# Для запуска теста из командной строки:
+# python -m pytest -s tests/test_resilience.py
+
+TARGET = "http://127.0.0.1:1"
+
+
+@allure.epic("Request resilience")
+class TestCircuitBreaker:
+    @allure.description("This test checks that retries and the breaker are off unless configured")
+    def test_defaults_are_off(self):
+        assert Policy().retries == 0
+        breaker = CircuitBreaker(0, 30)
+        for _ in range(10):
+            breaker.before_request(TARGET)
+            breaker.record(False)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @allure.description("This test checks that a half-open breaker lets through a single probe")
+    def test_half_open_allows_one_probe(self):
+        breaker = CircuitBreaker(2, 0.05)
+        breaker.record(False)
+        breaker.record(False)
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request(TARGET)
+
+        time.sleep(0.06)
+        breaker.before_request(TARGET)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(CircuitOpenError, match="half-open"):
+            breaker.before_request(TARGET)
+
+        breaker.record(True)
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.before_request(TARGET)
+
+    @allure.description("This test checks that a failed probe opens the breaker again")
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(1, 0.05)
+        breaker.record(False)
+        time.sleep(0.06)
+        breaker.before_request(TARGET)
+        breaker.record(False)
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request(TARGET)
@@ -0,0 +1,67 @@
+import pytest
+import allure
+from lib.assertions import Assertions
+from lib.base_case import BaseCase
+from lib.my_requests import MyRequests
+from lib.response_cache import ResponseCache
+
+# Для запуска теста из командной строки:
+# python -m pytest -s tests/test_response_cache.py
+
+
+@pytest.fixture
+def response_cache(local_env, monkeypatch):
+    monkeypatch.setattr(ResponseCache, "enabled", True)
+    monkeypatch.setattr(ResponseCache, "ttl", 60)
+    ResponseCache.clear()
+    yield ResponseCache
+    ResponseCache.clear()
+
+
+@allure.epic("Response cache")
+class TestResponseCache(BaseCase):
+    @allure.description("This test checks that a stale entry is revalidated with its ETag")
+    def test_etag_revalidation(self, response_cache, monkeypatch):
+        # ttl=0: каждая запись сразу устаревает и перепроверяется условным запросом
+        monkeypatch.setattr(ResponseCache, "ttl", 0)
+        first = MyRequests.get("/user/2")
+        Assertions.assert_code_status(first, 200)
+        assert first.headers.get("ETag"), "LocalServer did not send an ETag"
+        revalidated = response_cache.stats()["revalidated"]
+
+        second = MyRequests.get("/user/2")
+        Assertions.assert_code_status(second, 200)
+        assert getattr(second, "from_cache", False), "Revalidated response was not served from the cache"
+        assert second.json() == first.json()
+        assert response_cache.stats()["revalidated"] == revalidated + 1, "Server did not answer 304 to If-None-Match"
+
+    @allure.description("This test checks that PUT drops the cached user")
+    def test_put_invalidates(self, response_cache):
+        data = self.prepare_registration_data()
+        response = MyRequests.post("/user", data=data)
+        Assertions.assert_code_status(response, 200)
+        user_id = self.get_json_value(response, "id")
+        auth = self.login(data["email"], data["password"], fresh=True)
+
+        MyRequests.get(f"/user/{user_id}", headers=auth.headers, cookies=auth.cookies)
+        cached = MyRequests.get(f"/user/{user_id}", headers=auth.headers, cookies=auth.cookies)
+        assert getattr(cached, "from_cache", False), "Second GET was not served from the cache"
+
+        response = MyRequests.put(f"/user/{user_id}", data={"firstName": "Changed"}, headers=auth.headers, cookies=auth.cookies)
+        Assertions.assert_code_status(response, 200)
+
+        response = MyRequests.get(f"/user/{user_id}", headers=auth.headers, cookies=auth.cookies)
+        assert not getattr(response, "from_cache", False), "GET after PUT was served from the cache"
+        Assertions.assert_json_value_by_name(response, "firstName", "Changed", "GET after PUT returned the old user")
+
+    @allure.description("This test checks that streamed responses are cached with their body in memory")
+    def test_streamed_response_is_cached(self, response_cache, monkeypatch):
+        monkeypatch.setattr(MyRequests, "stream", True)
+        first = MyRequests.get("/user/2")
+        assert first.body is not None, "Response was not streamed"
+
+        cached = MyRequests.get("/user/2")
+        assert getattr(cached, "from_cache", False), "Streamed response was not served from the cache"
+        assert getattr(cached, "body", None) is None, "Cached copy shares the temporary file of the streamed response"
+        first.close()
+        assert cached.json() == {"username": "Vitaliy"}
@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+import pytest
+import allure
+from lib import scheduler
+from lib.scheduler import ScenarioScheduler, check_xdist_mode, order, users_needed
+from lib.user_pool import PooledUser
+
+# Для запуска теста из командной строки:
+# python -m pytest -s tests/test_scheduler.py
+
+
+class FakeItem:
+    def __init__(self, name: str, state: str = None, mutates: bool = False, fixturenames: tuple = ()):
+        self.nodeid = name
+        self.fixturenames = fixturenames
+        self._marker = pytest.mark.state(state, mutates=mutates).mark if state else None
+        self.added_markers = []
+
+    def get_closest_marker(self, name: str):
+        return self._marker if name == "state" else None
+
+    def add_marker(self, marker):
+        self.added_markers.append(marker.mark)
+
+    def __repr__(self):
+        return self.nodeid
+
+
+class FakeUserPool:
+    def __init__(self):
+        self.acquired = 0
+        self.available = []
+
+    def acquire(self):
+        self.acquired += 1
+        return PooledUser(self.acquired, f"user{self.acquired}@example.com", "123", "sid", "token", {})
+
+    def release(self, user: PooledUser):
+        if not user.mutated and not user.deleted:
+            self.available.append(user)
+
+
+@allure.epic("Scenario scheduler")
+class TestScenarioScheduler:
+    @allure.description("This test checks that readers of a state run together and mutating tests run last")
+    def test_order(self):
+        items = [
+            FakeItem("mutating_1", "logged_in_user", mutates=True),
+            FakeItem("reader_two_1", "two_logged_in_users"),
+            FakeItem("stateless_1"),
+            FakeItem("reader_1", "logged_in_user"),
+            FakeItem("reader_two_2", "two_logged_in_users"),
+            FakeItem("stateless_2"),
+            FakeItem("reader_2", "logged_in_user"),
+        ]
+        assert [item.nodeid for item in order(items)] == [
+            "stateless_1", "stateless_2",
+            "reader_two_1", "reader_two_2",
+            "reader_1", "reader_2",
+            "mutating_1",
+        ]
+
+    @allure.description("This test checks that users of shared states are not reused by mutating tests")
+    def test_users_needed(self):
+        items = order([
+            FakeItem("reader_1", "logged_in_user"),
+            FakeItem("reader_2", "logged_in_user"),
+            FakeItem("pooled_1", fixturenames=("pooled_user",)),
+            FakeItem("pooled_2", fixturenames=("pooled_user",)),
+            FakeItem("mutating_1", "logged_in_user", mutates=True),
+            FakeItem("mutating_2", "two_logged_in_users", mutates=True),
+        ])
+        # Пользователь pooled_user возвращается в пул и становится общей копией читателей;
+        # общая копия и копии меняющих тестов не возвращаются: 1 + 1 + 2
+        assert users_needed(items) == 4
+
+    @allure.description("This test checks that readers share one user which never goes back to the pool")
+    def test_shared_state_is_not_returned_to_pool(self, monkeypatch):
+        pool = FakeUserPool()
+        monkeypatch.setattr(scheduler, "UserPool", pool)
+        plugin = ScenarioScheduler()
+        readers = [FakeItem("reader_1", "logged_in_user"), FakeItem("reader_2", "logged_in_user")]
+        mutating = FakeItem("mutating_1", "logged_in_user", mutates=True)
+        plugin.pytest_collection_modifyitems(None, readers + [mutating])
+
+        shared = plugin.get(readers[0])
+        assert plugin.get(readers[1]) is shared, "Readers of one state got different users"
+
+        for item in readers:
+            hook = plugin.pytest_runtest_teardown(item, None)
+            next(hook)
+            with pytest.raises(StopIteration):
+                next(hook)
+        assert shared.mutated, "Shared user was not taken out of the pool after the last reader"
+        assert pool.available == []
+
+        fresh = plugin.get(mutating)
+        assert fresh is not shared
+        plugin.finish(mutating, fresh)
+        assert pool.available == [], "Mutating test's user went back to the pool"
+
+    @allure.description("This test checks that readers and writers of one state share an xdist group")
+    def test_xdist_group(self):
+        plugin = ScenarioScheduler()
+        items = [
+            FakeItem("reader_1", "logged_in_user"),
+            FakeItem("mutating_1", "logged_in_user", mutates=True),
+            FakeItem("mutating_2", "two_logged_in_users", mutates=True),
+            FakeItem("stateless_1"),
+        ]
+        for item in items:
+            plugin.pytest_itemcollected(item)
+        groups = [[(marker.name, marker.args) for marker in item.added_markers] for item in items]
+        assert groups == [
+            [("xdist_group", ("state-logged_in_user",))],
+            [("xdist_group", ("state-logged_in_user",))],
+            [("xdist_group", ("state-two_logged_in_users",))],
+            [],
+        ]
+
+    @allure.description("This test checks that the default xdist mode is switched to loadgroup")
+    def test_xdist_mode(self):
+        config = SimpleNamespace(option=SimpleNamespace(dist="load"))
+        assert check_xdist_mode(config) is None
+        assert config.option.dist == "loadgroup"
+
+        config = SimpleNamespace(option=SimpleNamespace(dist="loadscope"))
+        assert "--dist loadgroup" in check_xdist_mode(config)
+        assert config.option.dist == "loadscope"
@@ -1,4 +1,3 @@
-import requests
 import pytest
 from lib.base_case import BaseCase
 from lib.assertions import Assertions
@@ -23,27 +22,18 @@ class TestUserAuth(BaseCase):
     ]
     # Вызывается перед каждым тестом
     def setup_method(self):
-        data = {
-            "email": "vinkotov@example.com",
-            "password": "1234"
-        }
+        auth = self.login("vinkotov@example.com", "1234")
 
-        response = MyRequests.post("/user/login", data=data)
-
-        self.auth_sid = self.get_cookie(response, "auth_sid")
-        self.token = self.get_header(response, "x-csrf-token")
-        self.user_id_from_auth_method = self.get_json_value(response, "user_id")
+        self.auth_sid = auth.auth_sid
+        self.token = auth.token
+        self.user_id_from_auth_method = auth.user_id
 
     @allure.description("This test successfully authorize user by email and password and get his info")
     @allure.severity(allure.severity_level.CRITICAL)
     @allure.link(name="Дока", url="https://playground.learnqa.ru/api/map")
     @pytest.mark.skip()
     def test_auth_user(self):
-        response = MyRequests.get(
-            "/user/auth",
-            headers={"x-csrf-token": self.token},
-            cookies={"auth_sid": self.auth_sid}
-        )
+        response = self.send_authorized("GET", "/user/auth", "vinkotov@example.com", "1234")
 
         Assertions.assert_json_value_by_name(
             response,
@@ -73,3 +63,26 @@ class TestUserAuth(BaseCase):
             0,
             f"User is authorized with condition {condition}"
         )
+
+    @allure.description("This test checks that a fresh_login test logs in again instead of using the login cache")
+    @pytest.mark.fresh_login
+    def test_fresh_login_marker(self):
+        first = self.login("vinkotov@example.com", "1234")
+        second = self.login("vinkotov@example.com", "1234")
+
+        assert first.auth_sid != self.auth_sid, "Test with fresh_login marker reused a cached login"
+        assert second.auth_sid != first.auth_sid, "Test with fresh_login marker reused a cached login"
+        assert second.user_id == self.user_id_from_auth_method
+
+
+    @allure.description("This test checks that an expired cached session is refreshed by send_authorized")
+    def test_expired_session_is_refreshed(self):
+        auth = self.login("vinkotov@example.com", "1234")
+        # Сессия из кэша протухла на сервере
+        auth.token = "expired"
+
+        response = self.send_authorized("DELETE", f"/user/{auth.user_id}", "vinkotov@example.com", "1234")
+
+        Assertions.assert_code_status(response, 400)
+        Assertions.assert_content(response, "Please, do not delete test users with ID 1, 2, 3, 4 or 5.")
+        assert self.login("vinkotov@example.com", "1234").token != "expired", "Expired session stayed in the cache"
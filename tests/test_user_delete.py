@@ -1,8 +1,8 @@
-import requests
 import pytest
 from lib.base_case import BaseCase
 from lib.assertions import Assertions
 from lib.my_requests import MyRequests
+from lib.reporting import step
 import allure
 
 
@@ -21,23 +21,16 @@ class TestUserDelete(BaseCase):
     @allure.severity(allure.severity_level.CRITICAL)
     def test_delete_negative_user_2(self):
         # LOGIN
-        with allure.step("It logins under the user with id 2"):
-            data = {
-                'email': 'vinkotov@example.com',
-                'password': '1234'
-            }
+        with step("It logins under the user with id 2"):
+            user_id_2 = self.login('vinkotov@example.com', '1234').user_id
 
-            response = MyRequests.post("/user/login", data=data)
-
-            auth_sid = self.get_cookie(response, "auth_sid")
-            token = self.get_header(response, "x-csrf-token")
-            user_id_2 = self.get_json_value(response, "user_id")
-
-        with allure.step("It tries to delete the user with id 2 and checks for an error when trying to delete"):
-            response = MyRequests.delete(
+        with step("It tries to delete the user with id 2 and checks for an error when trying to delete"):
+            # Если закэшированная сессия протухла, send_authorized залогинится заново
+            response = self.send_authorized(
+                "DELETE",
                 f"/user/{user_id_2}",
-                headers={"x-csrf-token": token},
-                cookies={"auth_sid": auth_sid},
+                'vinkotov@example.com',
+                '1234'
             )
 
             Assertions.assert_code_status(response, 400)
@@ -45,32 +38,17 @@ class TestUserDelete(BaseCase):
 
     @allure.description("The test removes the newly created user")
     @allure.severity(allure.severity_level.CRITICAL)
-    def test_delete_just_created_user(self):
-        # REGISTER
-        with allure.step("It registers the user"):
-            register_data = self.prepare_registration_data()
-            response = MyRequests.post("/user", data=register_data)
-
-            Assertions.assert_code_status(response, 200)
-            Assertions.assert_json_has_key(response, "id")
-
-            email = register_data['email']
-            password = register_data['password']
-            user_id = self.get_json_value(response, "id")
-
-        # LOGIN
-        with allure.step("It logs in under the newly created user"):
-            login_data = {
-                'email': email,
-                'password': password
-            }
-            response = MyRequests.post("/user/login", data=login_data)
-
-            auth_sid = self.get_cookie(response, "auth_sid")
-            token = self.get_header(response, "x-csrf-token")
+    @pytest.mark.state("logged_in_user", mutates=True)
+    def test_delete_just_created_user(self, state):
+        # REGISTER AND LOGIN
+        with step("It takes a fresh registered and logged in user"):
+            user_id = state.id
+            auth_sid = state.auth_sid
+            token = state.token
+            state.mark_deleted()
 
         # DELETE
-        with allure.step("It deletes the newly created user"):
+        with step("It deletes the newly created user"):
             response = MyRequests.delete(
                 f"/user/{user_id}",
                 headers={"x-csrf-token": token},
@@ -79,7 +57,7 @@ class TestUserDelete(BaseCase):
             Assertions.assert_code_status(response, 200)
 
         # GET
-        with allure.step("It checks that the user has been deleted"):
+        with step("It checks that the user has been deleted"):
             response = MyRequests.get(
                 f"/user/{user_id}",
                 headers={"x-csrf-token": token},
@@ -91,58 +69,22 @@ class TestUserDelete(BaseCase):
 
     @allure.description("Test tries to delete user1 with user2 tokens")
     @allure.severity(allure.severity_level.CRITICAL)
-    def test_delete_negative_foreign_user(self):
-        # REGISTER USER1
-        with allure.step("It registers the user1"):
-            register_data = self.prepare_registration_data()
-            response = MyRequests.post("/user", data=register_data)
-
-            Assertions.assert_code_status(response, 200)
-            Assertions.assert_json_has_key(response, "id")
-
-            email1 = register_data['email']
-            password1 = register_data['password']
-            user_id1 = self.get_json_value(response, "id")
-
-        # REGISTER USER2
-        with allure.step("It registers the user2"):
-            register_data = self.prepare_registration_data()
-            register_data['email'] = register_data['email'].replace("@", "_02@")
-
-            response = MyRequests.post("/user", data=register_data)
-
-            Assertions.assert_code_status(response, 200)
-            Assertions.assert_json_has_key(response, "id")
-
-            email2 = register_data['email']
-            password2 = register_data['password']
-            user_id2 = self.get_json_value(response, "id")
-
-        # LOGIN WITH USER1
-        with allure.step("It logs in under the user1"):
-            login_data = {
-                'email': email1,
-                'password': password1
-            }
-            response = MyRequests.post("/user/login", data=login_data)
-
-            auth_sid1 = self.get_cookie(response, "auth_sid")
-            token1 = self.get_header(response, "x-csrf-token")
-
-        # LOGIN WITH USER2
-        with allure.step("It logs in under the user2"):
-            login_data = {
-                'email': email2,
-                'password': password2
-            }
+    @pytest.mark.state("two_logged_in_users", mutates=True)
+    def test_delete_negative_foreign_user(self, state):
+        # REGISTER AND LOGIN WITH USER1 AND USER2
+        with step("It takes fresh registered and logged in user1 and user2"):
+            user1, user2 = state
 
-            response = MyRequests.post("/user/login", data=login_data)
+            auth_sid1 = user1.auth_sid
+            token1 = user1.token
 
-            auth_sid2 = self.get_cookie(response, "auth_sid")
-            token2 = self.get_header(response, "x-csrf-token")
+            email2 = user2.email
+            user_id2 = user2.id
+            auth_sid2 = user2.auth_sid
+            token2 = user2.token
 
         # DELETE USER2 UNDER USER1
-        with allure.step("It tries to delete user2 under the user1"):
+        with step("It tries to delete user2 under the user1"):
             response = MyRequests.delete(
                 f"/user/{user_id2}",
                 headers={"x-csrf-token": token1},
@@ -152,11 +94,12 @@ class TestUserDelete(BaseCase):
             Assertions.assert_code_status(response, 200)
 
         # GET
-        with allure.step("It checks that the user has not been deleted"):
+        with step("It checks that the user has not been deleted"):
             response = MyRequests.get(
                 f"/user/{user_id2}",
                 headers={"x-csrf-token": token2},
                 cookies={"auth_sid": auth_sid2},
+                fresh=True
             )
 
             Assertions.assert_json_value_by_name(
@@ -1,7 +1,9 @@
-import requests
+import pytest
 from lib.base_case import BaseCase
 from lib.assertions import Assertions
 from lib.my_requests import MyRequests
+from lib.async_requests import AsyncMyRequests
+from lib.reporting import step
 import allure
 
 #  Для генерации allure-отчета
@@ -16,33 +18,16 @@ import allure
 class TestUserEdit(BaseCase):
     @allure.description("This test edits a newly created user")
     @allure.severity(allure.severity_level.CRITICAL)
-    def test_edit_just_created_user(self):
-        # REGISTER
-        with allure.step("It registers the user"):
-            register_data = self.prepare_registration_data()
-            response = MyRequests.post("/user", data=register_data)
-
-            Assertions.assert_code_status(response, 200)
-            Assertions.assert_json_has_key(response, "id")
-
-            email = register_data['email']
-            first_name = register_data['firstName']
-            password = register_data['password']
-            user_id = self.get_json_value(response, "id")
-
-        # LOGIN
-        with allure.step("It logs in under the newly created user"):
-            login_data = {
-                'email': email,
-                'password': password
-            }
-            response = MyRequests.post("/user/login", data=login_data)
-
-            auth_sid = self.get_cookie(response, "auth_sid")
-            token = self.get_header(response, "x-csrf-token")
+    @pytest.mark.state("logged_in_user", mutates=True)
+    def test_edit_just_created_user(self, state):
+        # REGISTER AND LOGIN
+        with step("It takes a fresh registered and logged in user"):
+            user_id = state.id
+            auth_sid = state.auth_sid
+            token = state.token
 
         # EDIT
-        with allure.step("It edits the newly created user"):
+        with step("It edits the newly created user"):
             new_name = "Changed Name"
 
             response = MyRequests.put(
@@ -54,7 +39,7 @@ class TestUserEdit(BaseCase):
             Assertions.assert_code_status(response, 200)
 
         # GET
-        with allure.step("It checks that user data has been edited"):
+        with step("It checks that user data has been edited"):
             response = MyRequests.get(
                 f"/user/{user_id}",
                 headers={"x-csrf-token": token},
@@ -72,7 +57,7 @@ class TestUserEdit(BaseCase):
     @allure.severity(allure.severity_level.CRITICAL)
     def test_edit_negative_without_auth(self):
         # REGISTER
-        with allure.step("It registers the user"):
+        with step("It registers the user"):
             register_data = self.prepare_registration_data()
 
             response = MyRequests.post("/user", data=register_data)
@@ -83,7 +68,7 @@ class TestUserEdit(BaseCase):
             user_id = self.get_json_value(response, "id")
 
         # EDIT
-        with allure.step("It tries to edit the user without registration and checks for errors"):
+        with step("It tries to edit the user without registration and checks for errors"):
             new_name = "Changed Name"
 
             response = MyRequests.put(
@@ -97,58 +82,39 @@ class TestUserEdit(BaseCase):
     @allure.description("This test tries to edit user1 with user2 tokens")
     @allure.severity(allure.severity_level.CRITICAL)
     def test_edit_negative_foreign_user(self):
-        # REGISTER USER1
-        with allure.step("It registers the user1"):
-            register_data = self.prepare_registration_data()
-            response = MyRequests.post("/user", data=register_data)
-
-            Assertions.assert_code_status(response, 200)
-            Assertions.assert_json_has_key(response, "id")
+        # REGISTER USER1 AND USER2
+        with step("It registers the user1 and the user2"):
+            # Регистрации независимы и идут одновременно
+            register_data1 = self.prepare_registration_data()
+            register_data2 = self.prepare_registration_data()
+
+            response1, response2 = AsyncMyRequests.run(
+                AsyncMyRequests.post("/user", data=register_data1),
+                AsyncMyRequests.post("/user", data=register_data2)
+            )
 
-            email1 = register_data['email']
-            password1 = register_data['password']
-            user_id1 = self.get_json_value(response, "id")
+            Assertions.assert_code_status(response1, 200)
+            Assertions.assert_json_has_key(response1, "id")
+            Assertions.assert_code_status(response2, 200)
+            Assertions.assert_json_has_key(response2, "id")
 
-        # REGISTER USER2
-        with allure.step("It registers the user2"):
-            register_data = self.prepare_registration_data()
-            register_data['email'] = register_data['email'].replace("@", "_02@")
-            register_data['firstName'] = register_data['firstName'] + '_02'
+            first_name2 = register_data2['firstName']
+            user_id2 = self.get_json_value(response2, "id")
 
-            response = MyRequests.post("/user", data=register_data)
-
-            Assertions.assert_code_status(response, 200)
-            Assertions.assert_json_has_key(response, "id")
+        # LOGIN WITH USER1 AND USER2
+        with step("It logs in under the user1 and the user2"):
+            response1, response2 = AsyncMyRequests.run(
+                AsyncMyRequests.post("/user/login", data={'email': register_data1['email'], 'password': register_data1['password']}),
+                AsyncMyRequests.post("/user/login", data={'email': register_data2['email'], 'password': register_data2['password']})
+            )
 
-            email2 = register_data['email']
-            password2 = register_data['password']
-            first_name2 = register_data['firstName']
-            user_id2 = self.get_json_value(response, "id")
-
-        # LOGIN WITH USER1
-        with allure.step("It logs in under the user1"):
-            login_data = {
-                'email': email1,
-                'password': password1
-            }
-            response = MyRequests.post("/user/login", data=login_data)
-
-            auth_sid1 = self.get_cookie(response, "auth_sid")
-            token1 = self.get_header(response, "x-csrf-token")
-
-        # LOGIN WITH USER2
-        with allure.step("It logs in under the user1"):
-            login_data = {
-                'email': email2,
-                'password': password2
-            }
-            response = MyRequests.post("/user/login", data=login_data)
-
-            auth_sid2 = self.get_cookie(response, "auth_sid")
-            token2 = self.get_header(response, "x-csrf-token")
+            auth_sid1 = self.get_cookie(response1, "auth_sid")
+            token1 = self.get_header(response1, "x-csrf-token")
+            auth_sid2 = self.get_cookie(response2, "auth_sid")
+            token2 = self.get_header(response2, "x-csrf-token")
 
         # EDIT USER2 UNDER USER1
-        with allure.step("It tries to edit user2 under the user1"):
+        with step("It tries to edit user2 under the user1"):
             new_name = "Changed Name"
 
             response = MyRequests.put(
@@ -160,11 +126,12 @@ class TestUserEdit(BaseCase):
             Assertions.assert_code_status(response, 200)
 
         # GET
-        with allure.step("It checks that the user has not been edited"):
+        with step("It checks that the user has not been edited"):
             response = MyRequests.get(
                 f"/user/{user_id2}",
                 headers={"x-csrf-token": token2},
                 cookies={"auth_sid": auth_sid2},
+                fresh=True
             )
 
             Assertions.assert_json_value_by_name(
@@ -176,35 +143,16 @@ class TestUserEdit(BaseCase):
 
     @allure.description("This test tries to edit a user with an invalid email")
     @allure.severity(allure.severity_level.MINOR)
-    def test_edit_negative_invalid_email(self):
-        # REGISTER
-        with allure.step("It registers the user"):
-            register_data = self.prepare_registration_data()
-
-            response = MyRequests.post("/user", data=register_data)
-
-            Assertions.assert_code_status(response, 200)
-            Assertions.assert_json_has_key(response, "id")
-
-            email = register_data['email']
-            first_name = register_data['firstName']
-            password = register_data['password']
-            user_id = self.get_json_value(response, "id")
-
-        # LOGIN
-        with allure.step("It logs in under the user"):
-            login_data = {
-                'email': email,
-                'password': password
-            }
-
-            response = MyRequests.post("/user/login", data=login_data)
-
-            auth_sid = self.get_cookie(response, "auth_sid")
-            token = self.get_header(response, "x-csrf-token")
+    @pytest.mark.state("logged_in_user")
+    def test_edit_negative_invalid_email(self, state):
+        # REGISTER AND LOGIN
+        with step("It takes the shared registered and logged in user"):
+            user_id = state.id
+            auth_sid = state.auth_sid
+            token = state.token
 
         # EDIT
-        with allure.step("It tries to edit with invalid email and checks for an error when trying to edit"):
+        with step("It tries to edit with invalid email and checks for an error when trying to edit"):
             new_email = "vinkotovexample.com"
 
             response = MyRequests.put(
@@ -219,35 +167,16 @@ class TestUserEdit(BaseCase):
 
     @allure.description("This test tries to edit a user with too short name")
     @allure.severity(allure.severity_level.MINOR)
-    def test_edit_just_created_user_with_too_short_name(self):
-        # REGISTER
-        with allure.step("It registers the user"):
-            register_data = self.prepare_registration_data()
-
-            response = MyRequests.post("/user", data=register_data)
-
-            Assertions.assert_code_status(response, 200)
-            Assertions.assert_json_has_key(response, "id")
-
-            email = register_data['email']
-            first_name = register_data['firstName']
-            password = register_data['password']
-            user_id = self.get_json_value(response, "id")
-
-        # LOGIN
-        with allure.step("It logs in under the user"):
-            login_data = {
-                'email': email,
-                'password': password
-            }
-
-            response = MyRequests.post("/user/login", data=login_data)
-
-            auth_sid = self.get_cookie(response, "auth_sid")
-            token = self.get_header(response, "x-csrf-token")
+    @pytest.mark.state("logged_in_user")
+    def test_edit_just_created_user_with_too_short_name(self, state):
+        # REGISTER AND LOGIN
+        with step("It takes the shared registered and logged in user"):
+            user_id = state.id
+            auth_sid = state.auth_sid
+            token = state.token
 
         # EDIT
-        with allure.step("It tries to edit with too short name and checks for an error when trying to edit"):
+        with step("It tries to edit with too short name and checks for an error when trying to edit"):
             new_name = "T"
 
             response = MyRequests.put(
@@ -0,0 +1,59 @@
+import time
+import pytest
+import allure
+from lib.assertions import Assertions
+from lib.base_case import BaseCase
+from lib.data_generator import DataGenerator
+from lib.my_requests import MyRequests
+from lib.user_pool import PooledUser, UserPool
+
+# Для запуска теста из командной строки:
+# python -m pytest -s tests/test_user_pool.py
+
+
+class IsolatedUserPool(UserPool):
+    # Своё состояние подкласс получает в UserPool.__init_subclass__: общий пул сессии не трогается
+    size = 2
+    low_watermark = 0
+    acquire_timeout = 10
+    max_failures = 2
+
+
+@allure.epic("User pool")
+class TestUserPool(BaseCase):
+    @allure.description("This test checks that a pooled user is registered and logged in")
+    @allure.severity(allure.severity_level.CRITICAL)
+    def test_pooled_user_is_registered_and_logged_in(self, pooled_user):
+        response = MyRequests.get("/user/auth", headers=pooled_user.headers, cookies=pooled_user.cookies)
+        # POST /user возвращает id строкой, /user/auth - числом
+        Assertions.assert_json_value_by_name(response, "user_id", int(pooled_user.id), "Pooled user is not logged in")
+
+        response = MyRequests.get(f"/user/{pooled_user.id}", headers=pooled_user.headers, cookies=pooled_user.cookies)
+        Assertions.assert_code_status(response, 200)
+        Assertions.assert_json_value_by_name(
+            response, "email", pooled_user.email, "Pooled user is registered with another email"
+        )
+
+    @allure.description("This test checks that failed refills surface the registration error")
+    def test_refill_failure_is_reported(self, monkeypatch):
+        def registration_batch(count):
+            return [DataGenerator.registration_data(email="") for _ in range(count)]
+
+        monkeypatch.setattr(DataGenerator, "registration_batch", registration_batch)
+        started = time.monotonic()
+        try:
+            with pytest.raises(AssertionError, match="POST /user: status 400"):
+                IsolatedUserPool.acquire()
+        finally:
+            IsolatedUserPool.stop()
+        assert time.monotonic() - started < IsolatedUserPool.acquire_timeout, "Pool waited for the timeout instead of failing fast"
+
+    @allure.description("This test checks that an isolated pool keeps its own bookkeeping of mutated users")
+    def test_isolated_pool_bookkeeping(self):
+        user = PooledUser(1, "isolated@example.com", "123", "sid", "token", {})
+        user.mark_mutated()
+        IsolatedUserPool.release(user)
+
+        assert IsolatedUserPool.mutated_users == [user]
+        assert user not in UserPool.mutated_users, "User of the isolated pool is tracked by the session pool"
+        assert IsolatedUserPool._available is not UserPool._available